@@ -4,6 +4,8 @@ Django settings for Ideation Portal backend.
 
 import os
 from pathlib import Path
+from celery.schedules import crontab
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -23,6 +25,7 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:8000",
     "https://ideation.example.com",
 ]
+CORS_ALLOW_HEADERS = list(default_headers) + ['idempotency-key']
 
 # Application definition
 INSTALLED_APPS = [
@@ -32,6 +35,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third-party apps
     'rest_framework',
@@ -127,13 +131,20 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Hash uploads as they stream in, ahead of the default handlers that store them
+FILE_UPLOAD_HANDLERS = [
+    'common.upload_handlers.Sha256UploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'auth_app.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -145,13 +156,16 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # GCRA throttles kept in Redis, so limits hold across every worker and pod
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'common.throttling.RedisAnonRateThrottle',
+        'common.throttling.RedisUserRateThrottle',
+        'common.throttling.RedisScopedRateThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',
-        'user': '1000/hour'
+        'user': '1000/hour',
+        'uploads': os.getenv('UPLOAD_THROTTLE_RATE', '30/hour')
     }
 }
 
@@ -168,6 +182,34 @@ SIMPLE_JWT = {
 # Redis
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CACHE_URL', REDIS_URL),
+        'KEY_PREFIX': 'ideation',
+        'TIMEOUT': 300,
+    }
+}
+IDEA_CACHE_TTL = int(os.getenv('IDEA_CACHE_TTL', 300))
+
+# Short TTL for cached title autocomplete prefixes
+IDEA_AUTOCOMPLETE_TTL = int(os.getenv('IDEA_AUTOCOMPLETE_TTL', 30))
+
+# User profiles cached by ID for /users/me and nested user payloads
+USER_PROFILE_CACHE_TTL = int(os.getenv('USER_PROFILE_CACHE_TTL', 3600))
+
+# Serialize idea list rows from values() instead of ModelSerializer instances
+IDEA_FAST_LIST_SERIALIZATION = os.getenv('IDEA_FAST_LIST_SERIALIZATION', 'False') == 'True'
+
+# Near-duplicate detection: minimum title trigram similarity, and how many
+# similar ideas to return (pg_trgm's % operator prefilters at 0.3)
+IDEA_SIMILARITY_THRESHOLD = float(os.getenv('IDEA_SIMILARITY_THRESHOLD', 0.5))
+IDEA_SIMILAR_LIMIT = int(os.getenv('IDEA_SIMILAR_LIMIT', 5))
+
+# How long responses are replayed for a repeated Idempotency-Key header
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 60 * 60 * 24))
+
 # Celery
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
@@ -175,6 +217,30 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+CELERY_IMPORTS = [
+    'celery_tasks.file_tasks',
+    'celery_tasks.submission_tasks',
+    'celery_tasks.stats_tasks',
+]
+CELERY_BEAT_SCHEDULE = {
+    'reconcile-campaign-stats': {
+        'task': 'celery_tasks.stats_tasks.reconcile_campaign_stats',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'refresh-submission-rollups': {
+        'task': 'celery_tasks.stats_tasks.refresh_submission_rollups',
+        'schedule': crontab(minute='*/5'),
+    },
+    'rebuild-submission-rollups': {
+        'task': 'celery_tasks.stats_tasks.refresh_submission_rollups',
+        'schedule': crontab(hour=3, minute=30),
+        'kwargs': {'full': True},
+    },
+    'abort-stale-uploads': {
+        'task': 'celery_tasks.file_tasks.abort_stale_uploads',
+        'schedule': crontab(minute=15),
+    },
+}
 
 # AWS S3
 AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
@@ -183,6 +249,20 @@ AWS_STORAGE_BUCKET_NAME = os.getenv('AWS_STORAGE_BUCKET_NAME')
 AWS_S3_REGION_NAME = os.getenv('AWS_S3_REGION_NAME', 'us-east-1')
 AWS_S3_CUSTOM_DOMAIN = f'{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com'
 AWS_S3_OBJECT_PARAMETERS = {'CacheControl': 'max-age=86400'}
+# S3-compatible endpoint (MinIO, LocalStack) for local development; None means AWS
+AWS_S3_ENDPOINT_URL = os.getenv('AWS_S3_ENDPOINT_URL') or None
+
+# Direct-to-S3 document uploads: largest object accepted, and how long the
+# presigned POST (and its completion token) stays valid
+DOCUMENT_UPLOAD_MAX_SIZE = int(os.getenv('DOCUMENT_UPLOAD_MAX_SIZE', 10 * 1024 * 1024))
+DOCUMENT_PRESIGN_EXPIRES = int(os.getenv('DOCUMENT_PRESIGN_EXPIRES', 900))
+
+# Resumable uploads: S3 multipart when a bucket is configured, local chunk
+# files otherwise. Parts other than the last must be >= 5 MB for S3.
+DOCUMENT_UPLOAD_BACKEND = os.getenv('DOCUMENT_UPLOAD_BACKEND', 's3' if AWS_STORAGE_BUCKET_NAME else 'local')
+DOCUMENT_RESUMABLE_MAX_SIZE = int(os.getenv('DOCUMENT_RESUMABLE_MAX_SIZE', 500 * 1024 * 1024))
+DOCUMENT_UPLOAD_PART_SIZE = int(os.getenv('DOCUMENT_UPLOAD_PART_SIZE', 8 * 1024 * 1024))
+DOCUMENT_UPLOAD_SESSION_HOURS = int(os.getenv('DOCUMENT_UPLOAD_SESSION_HOURS', 24))
 
 # Logging
 LOGGING = {
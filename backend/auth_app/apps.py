@@ -0,0 +1,41 @@
+"""
+App configuration for Authentication app.
+"""
+
+from django.apps import AppConfig, apps
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+# Trigram indexes backing user search. auth_user belongs to django.contrib.auth,
+# so they are created here rather than declared on a model. Each one matches
+# the UPPER(column::text) LIKE expression that __icontains compiles to.
+USER_SEARCH_INDEXES = {
+    'auth_user_username_trgm_idx': 'username',
+    'auth_user_email_trgm_idx': 'email',
+    'auth_user_first_name_trgm_idx': 'first_name',
+    'auth_user_last_name_trgm_idx': 'last_name',
+}
+
+
+def create_user_search_indexes(sender, using, **kwargs):
+    """Create the auth_user trigram indexes once auth_user exists."""
+    with connections[using].cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for name, column in USER_SEARCH_INDEXES.items():
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {name} ON auth_user '
+                f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+            )
+
+
+class AuthAppConfig(AppConfig):
+    """App configuration for Authentication app."""
+    
+    name = 'auth_app'
+    
+    def ready(self):
+        """Connect model and migration signal handlers."""
+        from . import signals  # noqa: F401
+        
+        # This app has no models, so it never receives post_migrate itself
+        post_migrate.connect(create_user_search_indexes, sender=apps.get_app_config('auth'))
@@ -0,0 +1,79 @@
+"""
+User profile cache for Authentication app.
+
+Profiles are plain dicts of the User columns that API payloads embed,
+cached per user ID for USER_PROFILE_CACHE_TTL and deleted whenever the
+user row is saved or deleted. Cache errors fall back to the database.
+"""
+
+import logging
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from common.cache import record_cache_access
+
+logger = logging.getLogger(__name__)
+
+PROFILE_KEY = 'user:profile:{user_id}'
+PROFILE_CACHE_NAME = 'user_profiles'
+
+# Columns stored per profile; a superset of every user serializer's fields
+PROFILE_FIELDS = [
+    'id', 'username', 'email', 'first_name', 'last_name',
+    'is_staff', 'is_active', 'date_joined',
+]
+
+
+def profile_key(user_id):
+    """Cache key of one user's profile."""
+    return PROFILE_KEY.format(user_id=user_id)
+
+
+def get_user_profiles(user_ids, record_stats=True):
+    """Return {user_id: profile} for the given IDs, reading misses in one query."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    
+    keys = {profile_key(user_id): user_id for user_id in user_ids}
+    try:
+        cached = cache.get_many(list(keys))
+    except Exception as e:
+        logger.warning(f"User profile cache lookup failed: {str(e)}")
+        cached = None
+    
+    profiles = {keys[key]: profile for key, profile in (cached or {}).items()}
+    missing = user_ids - profiles.keys()
+    if cached is not None and record_stats:
+        if profiles:
+            record_cache_access(PROFILE_CACHE_NAME, hit=True, count=len(profiles))
+        if missing:
+            record_cache_access(PROFILE_CACHE_NAME, hit=False, count=len(missing))
+    if not missing:
+        return profiles
+    
+    loaded = {row['id']: row for row in User.objects.filter(pk__in=missing).values(*PROFILE_FIELDS)}
+    profiles.update(loaded)
+    if cached is not None and loaded:
+        try:
+            cache.set_many(
+                {profile_key(user_id): profile for user_id, profile in loaded.items()},
+                timeout=settings.USER_PROFILE_CACHE_TTL
+            )
+        except Exception as e:
+            logger.warning(f"User profile cache store failed: {str(e)}")
+    return profiles
+
+
+def get_user_profile(user_id, record_stats=True):
+    """Return the cached profile of one user, or None if the user does not exist."""
+    return get_user_profiles([user_id], record_stats=record_stats).get(user_id)
+
+
+def invalidate_user_profiles(*user_ids):
+    """Drop cached profiles so the next lookup reads the database."""
+    try:
+        cache.delete_many([profile_key(user_id) for user_id in user_ids])
+    except Exception as e:
+        logger.warning(f"Failed to invalidate user profiles {user_ids}: {str(e)}")
@@ -5,6 +5,13 @@ Serializers for Authentication app.
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from django.db import models, transaction
+
+from .authentication import revoke_user_tokens
+from .cache import get_user_profile, get_user_profiles
+
+# Serializer context key holding profiles loaded for the whole payload
+PROFILES_CONTEXT_KEY = 'user_profiles'
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -39,6 +46,15 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'is_staff']
 
 
+class UserSummarySerializer(serializers.ModelSerializer):
+    """Minimal user projection for search results and pickers."""
+    
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name']
+        read_only_fields = fields
+
+
 class UserDetailSerializer(serializers.ModelSerializer):
     """Serializer for user detail view."""
     
@@ -69,8 +85,48 @@ class ChangePasswordSerializer(serializers.Serializer):
         return value
     
     def save(self):
-        """Save new password."""
+        """Save new password and revoke the user's existing tokens."""
         user = self.context['request'].user
         user.set_password(self.validated_data['new_password'])
         user.save()
+        transaction.on_commit(lambda: revoke_user_tokens(user.pk))
         return user
+
+
+def prime_user_profiles(context, user_ids):
+    """Load profiles for a whole payload into the serializer context in one batch."""
+    profiles = context.setdefault(PROFILES_CONTEXT_KEY, {})
+    profiles.update(get_user_profiles(set(user_ids) - profiles.keys() - {None}))
+
+
+class CachedUserField(serializers.Field):
+    """
+    Read-only nested user rendered from the profile cache.
+    
+    The field reads the relation's ID column (``source='submitter_id'``) and
+    projects the cached profile onto ``serializer_class.Meta.fields``, so no
+    join is needed to embed users. Those fields must be plain profile columns.
+    """
+    
+    def __init__(self, serializer_class, **kwargs):
+        kwargs['read_only'] = True
+        self.serializer_class = serializer_class
+        super().__init__(**kwargs)
+    
+    def to_representation(self, user_id):
+        profiles = self.context.get(PROFILES_CONTEXT_KEY, {})
+        profile = profiles.get(user_id) or get_user_profile(user_id)
+        if profile is None:
+            return None
+        return {name: profile[name] for name in self.serializer_class.Meta.fields}
+
+
+class CachedUserListSerializer(serializers.ListSerializer):
+    """List serializer that loads every CachedUserField profile in one batch."""
+    
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.Manager) else data)
+        user_fields = [field for field in self.child.fields.values() if isinstance(field, CachedUserField)]
+        if user_fields:
+            prime_user_profiles(self.child.context, {field.get_attribute(item) for item in items for field in user_fields})
+        return super().to_representation(items)
@@ -0,0 +1,30 @@
+"""
+Signal handlers for Authentication app.
+"""
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .authentication import revoke_user_tokens
+from .cache import invalidate_user_profiles
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    """Drop the cached profile after any user edit, and revoke the tokens of deactivated users."""
+    # Logins only touch last_login, which profiles do not carry
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(lambda: invalidate_user_profiles(instance.pk))
+    
+    if (update_fields is None or 'is_active' in update_fields) and not instance.is_active:
+        transaction.on_commit(lambda: revoke_user_tokens(instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    """Drop the cached profile of a deleted user."""
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user_profiles(user_id))
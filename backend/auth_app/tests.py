@@ -4,9 +4,22 @@ Tests for Authentication app.
 
 import pytest
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from .cache import get_user_profiles, profile_key
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    """Use an isolated in-memory cache instead of Redis."""
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    }
+    cache.clear()
+    return cache
+
 
 @pytest.fixture
 def api_client():
@@ -14,6 +27,15 @@ def api_client():
     return APIClient()
 
 
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Point the shared Redis client at an in-memory fake."""
+    import fakeredis
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr('common.redis_client._client', client)
+    return client
+
+
 @pytest.fixture
 def user(db):
     """Create test user."""
@@ -131,3 +153,196 @@ class TestUserViewSet:
         response = api_client.get('/api/v1/auth/users/me/')
         
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestUserSearch:
+    """Tests for user search and batch lookup."""
+    
+    @pytest.fixture
+    def people(self, db):
+        """Create users to search for."""
+        return [
+            User.objects.create_user(username='jdoe', email='jane@example.com', first_name='Jane', last_name='Doe'),
+            User.objects.create_user(username='jsmith', email='john@example.com', first_name='John', last_name='Smith'),
+            User.objects.create_user(username='gone', email='gone@example.com', first_name='Jane', last_name='Gone',
+                                     is_active=False),
+        ]
+    
+    def test_search_matches_name_terms(self, api_client, user, people):
+        """Test every term must match username, email or name."""
+        api_client.force_authenticate(user=user)
+        response = api_client.get('/api/v1/auth/users/search/', {'q': 'jane do'})
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert [row['username'] for row in response.data] == ['jdoe']
+        assert set(response.data[0]) == {'id', 'username', 'first_name', 'last_name'}
+    
+    def test_search_matches_email_and_skips_inactive(self, api_client, user, people):
+        """Test email substrings match and inactive users are left out."""
+        api_client.force_authenticate(user=user)
+        response = api_client.get('/api/v1/auth/users/search/', {'q': 'example.com', 'limit': 25})
+        
+        assert {row['username'] for row in response.data} == {'testuser', 'jdoe', 'jsmith'}
+    
+    def test_search_short_query_returns_nothing(self, api_client, user, people, django_assert_num_queries):
+        """Test queries without a term of the minimum length skip the database."""
+        api_client.force_authenticate(user=user)
+        with django_assert_num_queries(0):
+            response = api_client.get('/api/v1/auth/users/search/', {'q': 'ja do'})
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == []
+    
+    def test_search_short_terms_only_rank(self, api_client, user, people):
+        """Test terms below the minimum length order matches without filtering them."""
+        api_client.force_authenticate(user=user)
+        response = api_client.get('/api/v1/auth/users/search/', {'q': 'example.com jd', 'limit': 25})
+        
+        assert {row['username'] for row in response.data} == {'testuser', 'jdoe', 'jsmith'}
+        assert response.data[0]['username'] == 'jdoe'
+    
+    def test_lookup_by_ids(self, api_client, user, people):
+        """Test many users are fetched by ID in one query."""
+        api_client.force_authenticate(user=user)
+        ids = ','.join(str(person.id) for person in people[:2])
+        response = api_client.get('/api/v1/auth/users/lookup/', {'ids': ids})
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert [row['id'] for row in response.data] == [people[0].id, people[1].id]
+    
+    def test_lookup_rejects_bad_ids(self, api_client, user):
+        """Test non-integer ids are rejected."""
+        api_client.force_authenticate(user=user)
+        response = api_client.get('/api/v1/auth/users/lookup/', {'ids': '1,abc'})
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestUserProfileCache:
+    """Tests for the cached user profiles."""
+    
+    def test_me_served_from_cache(self, api_client, user, django_assert_num_queries):
+        """Test repeated /me calls skip the database after the first one."""
+        api_client.force_authenticate(user=user)
+        api_client.get('/api/v1/auth/users/me/')
+        
+        with django_assert_num_queries(0):
+            response = api_client.get('/api/v1/auth/users/me/')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['username'] == 'testuser'
+        assert response.data['email'] == 'test@example.com'
+    
+    def test_profile_invalidated_on_save(self, user, django_capture_on_commit_callbacks):
+        """Test saving a user drops the cached profile."""
+        get_user_profiles([user.id])
+        assert cache.get(profile_key(user.id)) is not None
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            user.first_name = 'Renamed'
+            user.save()
+        
+        assert cache.get(profile_key(user.id)) is None
+        assert get_user_profiles([user.id])[user.id]['first_name'] == 'Renamed'
+    
+    def test_password_change_invalidates_profile(self, api_client, user, django_capture_on_commit_callbacks):
+        """Test changing the password drops the cached profile."""
+        api_client.force_authenticate(user=user)
+        api_client.get('/api/v1/auth/users/me/')
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.post('/api/v1/auth/users/change_password/', {
+                'old_password': 'testpass123',
+                'new_password': 'NewPass456!',
+                'new_password2': 'NewPass456!'
+            }, format='json')
+        
+        assert cache.get(profile_key(user.id)) is None
+    
+    def test_batch_lookup_reads_misses_in_one_query(self, user, django_assert_num_queries):
+        """Test uncached profiles are loaded together and cached ones skip the database."""
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass123')
+        get_user_profiles([user.id])
+        
+        with django_assert_num_queries(1):
+            profiles = get_user_profiles([user.id, other.id])
+        
+        assert profiles[other.id]['username'] == 'other'
+        with django_assert_num_queries(0):
+            get_user_profiles([user.id, other.id])
+
+
+class TestCachedJWTAuthentication:
+    """Tests for JWT authentication from the profile snapshot."""
+    
+    @pytest.fixture
+    def token_client(self, api_client, user, fake_redis):
+        """API client authenticated with a real access token."""
+        response = api_client.post('/api/v1/auth/login/', {
+            'username': 'testuser',
+            'password': 'testpass123'
+        }, format='json')
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return api_client
+    
+    def test_authenticated_requests_skip_users_table(self, token_client, django_assert_num_queries):
+        """Test the user is rebuilt from the cached snapshot once it is warm."""
+        token_client.get('/api/v1/auth/users/me/')
+        
+        with django_assert_num_queries(0):
+            response = token_client.get('/api/v1/auth/users/me/')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['username'] == 'testuser'
+    
+    def test_authentication_skips_profile_cache_stats(self, user, fake_redis):
+        """Test rebuilding request.user does not count profile cache hits or misses."""
+        from rest_framework_simplejwt.tokens import AccessToken
+        from common.cache import get_cache_stats
+        from .authentication import CachedJWTAuthentication
+        from .cache import PROFILE_CACHE_NAME
+        token = AccessToken.for_user(user)
+        
+        CachedJWTAuthentication().get_user(token)
+        CachedJWTAuthentication().get_user(token)
+        
+        stats = get_cache_stats([PROFILE_CACHE_NAME])[PROFILE_CACHE_NAME]
+        assert stats['hits'] == 0
+        assert stats['misses'] == 0
+    
+    def test_password_change_revokes_tokens(self, token_client, django_capture_on_commit_callbacks):
+        """Test tokens issued before a password change are rejected."""
+        with django_capture_on_commit_callbacks(execute=True):
+            response = token_client.post('/api/v1/auth/users/change_password/', {
+                'old_password': 'testpass123',
+                'new_password': 'NewPass456!',
+                'new_password2': 'NewPass456!'
+            }, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        
+        response = token_client.get('/api/v1/auth/users/me/')
+        
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    
+    def test_deactivated_user_rejected(self, token_client, user, django_capture_on_commit_callbacks):
+        """Test deactivating a user revokes their tokens and refreshes the snapshot."""
+        token_client.get('/api/v1/auth/users/me/')
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            user.is_active = False
+            user.save()
+        
+        response = token_client.get('/api/v1/auth/users/me/')
+        
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    
+    def test_falls_back_to_database_without_redis(self, token_client, monkeypatch):
+        """Test authentication still works from the users table when Redis is down."""
+        import fakeredis
+        server = fakeredis.FakeServer()
+        server.connected = False
+        monkeypatch.setattr('common.redis_client._client', fakeredis.FakeRedis(server=server))
+        
+        response = token_client.get('/api/v1/auth/users/me/')
+        
+        assert response.status_code == status.HTTP_200_OK
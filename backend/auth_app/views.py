@@ -5,14 +5,28 @@ Views for Authentication app.
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import Q, Value
+from django.db.models.functions import Concat, Greatest
 
+from common.cache import get_cache_stats
+from .cache import PROFILE_CACHE_NAME, get_user_profile
 from .serializers import (
     UserRegistrationSerializer, UserSerializer, UserDetailSerializer,
-    ChangePasswordSerializer
+    UserSummarySerializer, ChangePasswordSerializer
 )
 
+# Shortest search term and largest result count accepted by the search action.
+# Terms shorter than SEARCH_MIN_LENGTH have no trigrams for the username and
+# name indexes, so they only rank results; a query needs one longer term.
+SEARCH_MIN_LENGTH = 3
+SEARCH_MAX_LIMIT = 25
+
+# Most users fetched by one batch lookup
+LOOKUP_MAX_IDS = 100
+
 
 class UserViewSet(viewsets.ModelViewSet):
     """ViewSet for User model."""
@@ -40,10 +54,16 @@ class UserViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def me(self, request):
-        """Get current user."""
-        serializer = UserDetailSerializer(request.user)
+        """Get current user, served from the profile cache."""
+        profile = get_user_profile(request.user.pk) or request.user
+        serializer = UserDetailSerializer(profile)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsAdminUser])
+    def cache_stats(self, request):
+        """Get hit/miss counters for the user profile cache."""
+        return Response(get_cache_stats([PROFILE_CACHE_NAME]))
+    
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
     def change_password(self, request):
         """Change user password."""
@@ -61,3 +81,58 @@ class UserViewSet(viewsets.ModelViewSet):
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def search(self, request):
+        """Search active users by username, email or name for ?q=."""
+        terms = request.query_params.get('q', '').split()
+        query = ' '.join(terms)
+        filter_terms = [term for term in terms if len(term) >= SEARCH_MIN_LENGTH]
+        if not filter_terms:
+            return Response([])
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), SEARCH_MAX_LIMIT)
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Every long enough term must match some field, so "jane doe" finds Jane
+        # Doe; each UPPER(...) LIKE is served by the trigram indexes from AuthAppConfig
+        queryset = User.objects.filter(is_active=True)
+        for term in filter_terms:
+            queryset = queryset.filter(
+                Q(username__icontains=term) | Q(email__icontains=term) |
+                Q(first_name__icontains=term) | Q(last_name__icontains=term)
+            )
+        
+        full_name = Concat('first_name', Value(' '), 'last_name')
+        queryset = (
+            queryset
+            .annotate(similarity=Greatest(TrigramSimilarity('username', query), TrigramSimilarity(full_name, query)))
+            .order_by('-similarity', 'username')
+            .only(*UserSummarySerializer.Meta.fields)
+        )
+        serializer = UserSummarySerializer(queryset[:limit], many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def lookup(self, request):
+        """Get many users by ID (?ids=1,2,3) in one query."""
+        try:
+            ids = {int(value) for value in request.query_params.get('ids', '').split(',') if value.strip()}
+        except ValueError:
+            return Response(
+                {'error': 'ids must be a comma-separated list of integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ids) > LOOKUP_MAX_IDS:
+            return Response(
+                {'error': f'At most {LOOKUP_MAX_IDS} ids can be looked up at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        users = User.objects.filter(pk__in=ids).only(*UserSummarySerializer.Meta.fields).order_by('id')
+        serializer = UserSummarySerializer(users, many=True)
+        return Response(serializer.data)
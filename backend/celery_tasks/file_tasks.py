@@ -4,7 +4,8 @@ Celery tasks for file processing.
 
 from celery import shared_task
 from django.conf import settings
-from ideas.models import Document
+from django.core.files.storage import default_storage
+from documents.models import Document
 import logging
 import pyclamav
 
@@ -34,8 +35,14 @@ def scan_uploaded_file(self, document_id):
             document.save()
             
             # Delete infected file
-            from common.utils import delete_file_from_s3
-            delete_file_from_s3(document.file_path)
+            if document.blob_id:
+                # Every document sharing the content is infected, so its object goes
+                # even though the blob is still referenced
+                _share_verdict(document)
+                default_storage.delete(document.file_path)
+            else:
+                from common.utils import delete_file_from_s3
+                delete_file_from_s3(document.file_path)
             
             return f"Virus detected in {document.file_name}"
         
@@ -43,6 +50,7 @@ def scan_uploaded_file(self, document_id):
             logger.info(f"File is clean: {document.file_name}")
             document.virus_scan_status = 'CLEAN'
             document.save()
+            _share_verdict(document)
             
             return f"File {document.file_name} is clean"
     
@@ -56,6 +64,14 @@ def scan_uploaded_file(self, document_id):
         raise self.retry(exc=exc, countdown=60 * (2 ** self.request.retries))
 
 
+def _share_verdict(document):
+    """Apply a scan verdict to pending documents with the same content."""
+    if document.blob_id:
+        Document.objects.filter(blob_id=document.blob_id, virus_scan_status='PENDING').update(
+            virus_scan_status=document.virus_scan_status
+        )
+
+
 @shared_task
 def process_file_upload(document_id):
     """Process uploaded file."""
@@ -87,12 +103,55 @@ def cleanup_old_files():
         cutoff_date = timezone.now() - timedelta(days=30)
         old_documents = Document.objects.filter(uploaded_at__lt=cutoff_date)
         
+        # Shared blobs are skipped by delete_file_from_s3 and released when
+        # their last document is deleted
+        cleaned = 0
         for document in old_documents:
             from common.utils import delete_file_from_s3
             delete_file_from_s3(document.file_path)
             document.delete()
+            cleaned += 1
+        
+        # Unreferenced blobs whose queued purge never ran
+        from documents.blobs import purge_blob
+        from documents.models import StoredBlob
+        for sha256 in StoredBlob.objects.filter(ref_count=0).values_list('sha256', flat=True):
+            purge_blob(sha256)
         
-        logger.info(f"Cleaned up {old_documents.count()} old files")
+        logger.info(f"Cleaned up {cleaned} old files")
     
     except Exception as e:
         logger.error(f"Error cleaning up old files: {str(e)}")
+
+
+@shared_task
+def purge_unreferenced_blob(sha256):
+    """Delete a content-addressed blob once its last document is gone."""
+    from documents.blobs import purge_blob
+    
+    return purge_blob(sha256)
+
+
+@shared_task
+def abort_stale_uploads():
+    """Abort resumable uploads that expired before completing, releasing their parts."""
+    from django.utils import timezone
+    from documents.models import UploadSession
+    from documents.uploads import get_upload_backend
+    
+    # COMPLETING sessions past expiry belong to a complete that died mid-way
+    stale = UploadSession.objects.filter(status__in=['ACTIVE', 'COMPLETING'], expires_at__lt=timezone.now())
+    aborted = 0
+    for session in stale.iterator():
+        try:
+            get_upload_backend(session.backend).abort(session)
+        except Exception as e:
+            logger.error(f"Error aborting upload session {session.id}: {str(e)}")
+            continue
+        session.status = 'ABORTED'
+        session.save(update_fields=['status'])
+        session.parts.all().delete()
+        aborted += 1
+    
+    logger.info(f"Aborted {aborted} stale upload sessions")
+    return aborted
@@ -0,0 +1,73 @@
+"""
+Celery tasks for campaign statistics.
+"""
+
+from datetime import timedelta
+from celery import shared_task
+from django.db import transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from ideas.models import Campaign, CampaignStats, Idea, RollupWatermark, SubmissionRollup
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Campaigns reconciled per transaction, to keep row locks short
+RECONCILE_BATCH_SIZE = 100
+
+# Rescan this far behind the watermark, so rows written by transactions that
+# were still open at the previous run are not missed
+ROLLUP_OVERLAP = timedelta(minutes=5)
+ROLLUP_BATCH_SIZE = 500
+
+
+@shared_task
+def reconcile_campaign_stats():
+    """Recompute every campaign's stats from the source tables, correcting drift."""
+    campaign_ids = list(Campaign.objects.order_by('id').values_list('id', flat=True))
+    corrected = 0
+    
+    for start in range(0, len(campaign_ids), RECONCILE_BATCH_SIZE):
+        corrected += CampaignStats.objects.recompute(campaign_ids[start:start + RECONCILE_BATCH_SIZE])
+    
+    if corrected:
+        logger.warning(f"Corrected drifted stats for {corrected} of {len(campaign_ids)} campaigns")
+    else:
+        logger.info(f"Campaign stats consistent for {len(campaign_ids)} campaigns")
+    
+    return corrected
+
+
+@shared_task
+def refresh_submission_rollups(full=False):
+    """
+    Recompute the submission rollup buckets touched since the last watermark.
+    
+    With full=True every bucket is rebuilt from scratch, which also drops
+    buckets whose ideas were all moved or deleted.
+    """
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name='submissions')
+        started = timezone.now()
+        
+        changed = Idea.objects.filter(submitted_at__isnull=False)
+        if full:
+            SubmissionRollup.objects.all().delete()
+        elif watermark.processed_until:
+            changed = changed.filter(updated_at__gte=watermark.processed_until - ROLLUP_OVERLAP)
+        buckets = list(
+            changed.annotate(day=TruncDate('submitted_at'))
+            .values_list('campaign_id', 'day')
+            .distinct()
+            .order_by()
+        )
+        
+        rows = 0
+        for start in range(0, len(buckets), ROLLUP_BATCH_SIZE):
+            rows += SubmissionRollup.objects.recompute(buckets[start:start + ROLLUP_BATCH_SIZE])
+        
+        watermark.processed_until = started
+        watermark.save()
+    
+    logger.info(f"Refreshed {len(buckets)} submission buckets ({rows} rows)")
+    return len(buckets)
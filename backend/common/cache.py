@@ -0,0 +1,112 @@
+"""
+Response caching with generation-based invalidation.
+
+Cached entries embed the current generation of every scope they depend on
+(for example ``campaign:<id>`` or ``user:<id>``). Writes bump those
+generations, so stale entries are simply never read again and expire on
+their TTL instead of being deleted by wildcard.
+"""
+
+import hashlib
+import logging
+import time
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'gen:{scope}'
+RESPONSE_KEY = 'resp:{name}:{digest}'
+STATS_KEY = 'cache:stats:{name}:{outcome}'
+
+
+def _initial_generation():
+    """Seed value for new generation counters, so an evicted counter never reuses old values."""
+    return int(time.time() * 1000)
+
+
+def get_generations(scopes):
+    """Return the current generation of each scope, creating missing counters."""
+    keys = [GENERATION_KEY.format(scope=scope) for scope in scopes]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, _initial_generation(), timeout=None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def bump_generations(*scopes):
+    """Invalidate every cached entry that depends on one of the given scopes."""
+    for scope in scopes:
+        key = GENERATION_KEY.format(scope=scope)
+        try:
+            cache.add(key, _initial_generation(), timeout=None)
+            cache.incr(key)
+        except Exception as e:
+            logger.warning(f"Failed to bump cache generation {key}: {str(e)}")
+
+
+def record_cache_access(name, hit, count=1):
+    """Count cache hits or misses for the given cache name."""
+    key = STATS_KEY.format(name=name, outcome='hits' if hit else 'misses')
+    try:
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            # First access since the counter was created or evicted
+            if not cache.add(key, count, timeout=None):
+                cache.incr(key, count)
+    except Exception as e:
+        logger.warning(f"Failed to record cache access {key}: {str(e)}")
+
+
+def get_cache_stats(names):
+    """Return hit/miss counters and hit rate for the given cache names."""
+    keys = {
+        (name, outcome): STATS_KEY.format(name=name, outcome=outcome)
+        for name in names
+        for outcome in ('hits', 'misses')
+    }
+    values = cache.get_many(list(keys.values()))
+    
+    stats = {}
+    for name in names:
+        hits = values.get(keys[(name, 'hits')], 0)
+        misses = values.get(keys[(name, 'misses')], 0)
+        total = hits + misses
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else None,
+        }
+    return stats
+
+
+def cached_response_data(name, key_parts, scopes, build, timeout):
+    """
+    Return response data from the cache, or build and cache it.
+    
+    ``key_parts`` identify the request (visibility scope, path, params) and
+    ``scopes`` are the generation scopes the data depends on. Cache errors
+    fall back to building the data so Redis outages never fail a request.
+    """
+    try:
+        generations = get_generations(scopes)
+        digest = hashlib.sha1(repr((key_parts, scopes, generations)).encode()).hexdigest()
+        key = RESPONSE_KEY.format(name=name, digest=digest)
+        data = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Cache lookup failed for {name}: {str(e)}")
+        return build()
+    
+    if data is not None:
+        record_cache_access(name, hit=True)
+        return data
+    
+    record_cache_access(name, hit=False)
+    data = build()
+    try:
+        cache.set(key, data, timeout)
+    except Exception as e:
+        logger.warning(f"Cache store failed for {name}: {str(e)}")
+    return data
@@ -0,0 +1,124 @@
+"""
+Idempotency-Key support for retried POST requests.
+
+The first response for a (user, scope, key) triple is stored in the cache
+and replayed for repeats within IDEMPOTENCY_KEY_TTL, without running the
+write path again. A short lock key makes concurrent duplicates fail fast
+instead of racing each other.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import UploadedFile
+from rest_framework.response import Response
+
+from .exceptions import ConflictError, ValidationError
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+RESPONSE_KEY = 'idem:{user}:{scope}:{key}'
+LOCK_KEY = 'idem:lock:{user}:{scope}:{key}'
+MAX_KEY_LENGTH = 255
+
+# How long an in-flight request holds its key before a retry may run it again
+LOCK_TIMEOUT = 60
+
+
+class IdempotencyKeyReusedError(ValidationError):
+    """Error when an Idempotency-Key is replayed with a different request."""
+    status_code = 422
+    default_detail = 'Idempotency-Key was already used with a different request.'
+    default_code = 'idempotency_key_reused'
+
+
+def request_fingerprint(request):
+    """Hash the parts of a request that a replay must repeat exactly."""
+    data = {}
+    fields = request.data.items()
+    # Only set once request.data has parsed the upload
+    digests = getattr(request, 'upload_sha256', {})
+    for name, value in fields:
+        if isinstance(value, UploadedFile):
+            # Sha256UploadHandler hashed the contents while streaming; name and size are a fallback
+            if name in digests:
+                value = {'file': value.name, 'sha256': digests[name]}
+            else:
+                value = {'file': value.name, 'size': value.size}
+        data[name] = value
+    payload = json.dumps([request.method, request.path, data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _store(response_key, fingerprint, response):
+    """Store a response for replay; the write already happened, so errors are only logged."""
+    try:
+        cache.set(response_key, {
+            'fingerprint': fingerprint,
+            'status': response.status_code,
+            'data': response.data,
+        }, timeout=settings.IDEMPOTENCY_KEY_TTL)
+    except Exception as e:
+        logger.warning(f"Failed to store idempotent response {response_key}: {str(e)}")
+
+
+def _release(lock_key):
+    """Release an in-flight lock, leaving it to expire if the cache is unavailable."""
+    try:
+        cache.delete(lock_key)
+    except Exception as e:
+        logger.warning(f"Failed to release idempotency lock {lock_key}: {str(e)}")
+
+
+def idempotent(scope):
+    """
+    Make a DRF view method replay its first response for a repeated Idempotency-Key.
+    
+    Requests without the header run normally. Only responses below 500 are
+    stored, so a failed attempt can be retried with the same key.
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(view, request, *args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                return view_method(view, request, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                raise ValidationError(f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters.')
+            
+            # Keys are client-chosen strings, so only their digest goes into cache keys
+            digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+            names = {'user': request.user.pk, 'scope': scope, 'key': digest}
+            response_key = RESPONSE_KEY.format(**names)
+            lock_key = LOCK_KEY.format(**names)
+            fingerprint = request_fingerprint(request)
+            
+            try:
+                stored = cache.get(response_key)
+                locked = stored is None and not cache.add(lock_key, fingerprint, timeout=LOCK_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Idempotency store unavailable for {response_key}: {str(e)}")
+                return view_method(view, request, *args, **kwargs)
+            
+            if stored is not None:
+                if stored['fingerprint'] != fingerprint:
+                    raise IdempotencyKeyReusedError()
+                return Response(stored['data'], status=stored['status'], headers={REPLAYED_HEADER: 'true'})
+            if locked:
+                raise ConflictError('A request with this Idempotency-Key is already in progress.')
+            
+            try:
+                response = view_method(view, request, *args, **kwargs)
+                if response.status_code < 500:
+                    _store(response_key, fingerprint, response)
+                return response
+            finally:
+                _release(lock_key)
+        
+        return wrapper
+    return decorator
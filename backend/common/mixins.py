@@ -0,0 +1,57 @@
+"""
+View mixins for the application.
+"""
+
+import hashlib
+from django.core.exceptions import ValidationError
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class ConditionalRetrieveMixin:
+    """
+    ETag / If-None-Match support for detail views.
+    
+    Views implement get_etag_components() with a cheap query for the
+    version columns of one object, so a 304 can be returned before the
+    object graph is loaded or serialized.
+    """
+    
+    def get_etag_components(self, pk):
+        """Return a tuple of version values for the object, or None if not visible."""
+        raise NotImplementedError
+    
+    def get_object_etag(self, pk):
+        """Build a strong ETag for the object and the requested representation."""
+        try:
+            components = self.get_etag_components(pk)
+        except (TypeError, ValueError, ValidationError):
+            return None
+        if components is None:
+            return None
+        
+        # Query params select the representation, so they are part of the tag
+        raw = repr((str(pk), components, sorted(self.request.query_params.lists())))
+        return quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+    
+    def conditional_response(self, request, etag, build):
+        """Return 304 if If-None-Match matches the ETag, otherwise build the response."""
+        if etag is not None and self._etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        
+        response = build()
+        if etag is not None:
+            response['ETag'] = etag
+        return response
+    
+    @staticmethod
+    def _etag_matches(request, etag):
+        """Weak comparison of If-None-Match against the ETag (RFC 7232)."""
+        header = request.META.get('HTTP_IF_NONE_MATCH')
+        if not header:
+            return False
+        candidates = parse_etags(header)
+        return '*' in candidates or any(
+            candidate.replace('W/', '', 1) == etag for candidate in candidates
+        )
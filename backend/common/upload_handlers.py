@@ -0,0 +1,31 @@
+"""
+Upload handlers for the application.
+"""
+
+import hashlib
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+class Sha256UploadHandler(FileUploadHandler):
+    """
+    Hash every uploaded file while its chunks stream in.
+    
+    Listed before the handlers that store the file, it passes each chunk on
+    unchanged and records the hex digest in ``request.upload_sha256`` keyed
+    by form field name, so content can be deduplicated without re-reading it.
+    """
+    
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.hasher = hashlib.sha256()
+    
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return raw_data
+    
+    def file_complete(self, file_size):
+        if not hasattr(self.request, 'upload_sha256'):
+            self.request.upload_sha256 = {}
+        self.request.upload_sha256[self.field_name] = self.hasher.hexdigest()
+        # Let the next handler build the file object
+        return None
@@ -5,6 +5,8 @@ Utility functions for the application.
 import os
 import uuid
 from datetime import datetime
+import boto3
+from botocore.exceptions import ClientError
 from django.core.files.storage import default_storage
 from django.conf import settings
 
@@ -26,8 +28,13 @@ def upload_file_to_s3(file, file_name):
 
 
 def delete_file_from_s3(file_path):
-    """Delete file from S3."""
+    """Delete file from S3, leaving shared content-addressed blobs to their reference count."""
+    from documents.models import StoredBlob
+    
     try:
+        # Blob objects are purged by documents.blobs.purge_blob once their last reference goes
+        if StoredBlob.objects.filter(path=file_path).exists():
+            return
         if default_storage.exists(file_path):
             default_storage.delete(file_path)
     except Exception as e:
@@ -42,6 +49,44 @@ def get_file_url(file_path):
         raise Exception(f"Failed to get file URL: {str(e)}")
 
 
+def get_s3_client():
+    """Return an S3 client, pointed at AWS_S3_ENDPOINT_URL when set (e.g. MinIO)."""
+    return boto3.client(
+        's3',
+        endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+        region_name=settings.AWS_S3_REGION_NAME,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
+    )
+
+
+def create_presigned_upload(key, content_type, max_size, expires_in):
+    """Return a presigned POST for one object key, limited to a content type and size."""
+    try:
+        return get_s3_client().generate_presigned_post(
+            settings.AWS_STORAGE_BUCKET_NAME,
+            key,
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                {'Content-Type': content_type},
+                ['content-length-range', 1, max_size],
+            ],
+            ExpiresIn=expires_in
+        )
+    except Exception as e:
+        raise Exception(f"Failed to presign upload: {str(e)}")
+
+
+def head_s3_object(key):
+    """Return the HEAD metadata of an S3 object, or None if it does not exist."""
+    try:
+        return get_s3_client().head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        raise Exception(f"Failed to read S3 object {key}: {str(e)}")
+
+
 def format_datetime(dt):
     """Format datetime to ISO format."""
     if dt:
@@ -74,11 +119,12 @@ def validate_file_size(file, max_size_mb=10):
 
 
 def validate_file_type(file, allowed_types=None):
-    """Validate file type."""
+    """Validate file type of an uploaded file or a file name."""
     if allowed_types is None:
         allowed_types = ['pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'txt', 'jpg', 'jpeg', 'png']
     
-    ext = file.name.split('.')[-1].lower()
+    name = file if isinstance(file, str) else file.name
+    ext = name.split('.')[-1].lower()
     if ext not in allowed_types:
         raise ValueError(f"File type {ext} is not allowed")
     return True
@@ -0,0 +1,15 @@
+"""
+App configuration for Documents app.
+"""
+
+from django.apps import AppConfig
+
+
+class DocumentsConfig(AppConfig):
+    """App configuration for Documents app."""
+    
+    name = 'documents'
+    
+    def ready(self):
+        """Connect model signal handlers."""
+        from . import signals  # noqa: F401
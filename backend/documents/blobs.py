@@ -0,0 +1,113 @@
+"""
+Content-addressed document storage for Documents app.
+
+Uploads are stored once per SHA-256 under blobs/<2 hex>/<sha256>.<ext>; every
+Document with the same bytes points at the same StoredBlob, which counts
+its references. A blob whose count drops to zero keeps its row until
+purge_blob re-checks it under a row lock and deletes the object with it,
+so an upload taking a new reference meanwhile never loses its bytes.
+"""
+
+import hashlib
+import os
+from contextlib import contextmanager
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import StoredBlob
+
+# The extension keeps download URLs typed; identical bytes share the first upload's
+BLOB_PATH = 'blobs/{prefix}/{sha256}{ext}'
+
+
+def blob_path(sha256, file_name):
+    """Storage path for content with this digest, keeping the file name's extension."""
+    ext = os.path.splitext(file_name)[1].lower()
+    return BLOB_PATH.format(prefix=sha256[:2], sha256=sha256, ext=ext)
+
+
+def uploaded_sha256(request, field_name, file):
+    """Return the digest Sha256UploadHandler recorded for a file, hashing it only as a fallback."""
+    digest = getattr(request, 'upload_sha256', {}).get(field_name)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+@contextmanager
+def blob_reference(file, sha256):
+    """
+    Yield the StoredBlob for this content inside a transaction that holds one new reference.
+    
+    New bytes are written before the transaction opens, so no storage call
+    runs while it is held. If the block fails they are deleted again unless
+    another upload registered the same object meanwhile.
+    """
+    path = StoredBlob.objects.filter(sha256=sha256).values_list('path', flat=True).first()
+    written = path is None
+    if written:
+        path = default_storage.save(blob_path(sha256, file.name), file)
+    
+    try:
+        with transaction.atomic():
+            blob, created = _take_reference(sha256, path, file.size)
+            if created and not written:
+                # The blob found above was purged with its object before the reference was taken
+                blob.path = default_storage.save(path, file)
+                blob.save(update_fields=['path'])
+            yield blob
+    except Exception:
+        if written:
+            _delete_unreferenced(path)
+        raise
+    
+    if written and blob.path != path:
+        # A concurrent upload of the same content registered its own copy first
+        _delete_unreferenced(path)
+
+
+def _take_reference(sha256, path, size):
+    """Add one reference to the content's blob, registering path for it if none exists; return (blob, created)."""
+    # The UPDATE waits on purge_blob's row lock, so a purged row is seen as gone
+    if StoredBlob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') + 1):
+        return StoredBlob.objects.get(sha256=sha256), False
+    try:
+        with transaction.atomic():
+            return StoredBlob.objects.create(sha256=sha256, path=path, size=size, ref_count=1), True
+    except IntegrityError:
+        return _take_reference(sha256, path, size)
+
+
+def release_blob(sha256):
+    """Drop one reference; once none are left, queue the blob's purge after commit."""
+    from celery_tasks.file_tasks import purge_unreferenced_blob
+    
+    StoredBlob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') - 1)
+    if not StoredBlob.objects.filter(sha256=sha256, ref_count=0).exists():
+        return False
+    
+    transaction.on_commit(lambda: purge_unreferenced_blob.delay(sha256))
+    return True
+
+
+def purge_blob(sha256):
+    """Delete an unreferenced blob's object and row, unless a reference was taken meanwhile."""
+    with transaction.atomic():
+        blob = StoredBlob.objects.select_for_update().filter(sha256=sha256, ref_count=0).first()
+        if blob is None:
+            return False
+        # New references block on this lock, then find the row gone and store the bytes again
+        default_storage.delete(blob.path)
+        blob.delete()
+    return True
+
+
+def _delete_unreferenced(path):
+    """Delete a blob's object unless the same content was stored again meanwhile."""
+    if not StoredBlob.objects.filter(path=path).exists():
+        default_storage.delete(path)
@@ -7,6 +7,24 @@ from django.db import models
 from ideas.models import Idea
 
 
+class StoredBlob(models.Model):
+    """
+    Content-addressed file shared by every Document with the same bytes.
+    
+    ``ref_count`` is the number of documents pointing at the blob; the
+    stored object is deleted when the last of them is deleted.
+    """
+    
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    path = models.CharField(max_length=500, unique=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return self.sha256
+
+
 class Document(models.Model):
     """Document model for uploaded files."""
     
@@ -30,6 +48,10 @@ class Document(models.Model):
         default='PENDING'
     )
     virus_scan_result = models.TextField(null=True, blank=True)
+    # Shared content-addressed file; null for files stored per document
+    blob = models.ForeignKey(
+        StoredBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='documents'
+    )
     
     class Meta:
         ordering = ['-uploaded_at']
@@ -37,6 +59,15 @@ class Document(models.Model):
             models.Index(fields=['idea', '-uploaded_at']),
             models.Index(fields=['virus_scan_status']),
         ]
+        constraints = [
+            # Presigned and resumable uploads own their key; completing one twice
+            # must find the first document. Blob-backed documents share paths.
+            models.UniqueConstraint(
+                fields=['file_path'],
+                name='document_unshared_file_path_uniq',
+                condition=models.Q(blob__isnull=True)
+            ),
+        ]
     
     def __str__(self):
         return self.file_name
@@ -45,3 +76,81 @@ class Document(models.Model):
         """Get URL for file in S3."""
         from common.utils import get_file_url
         return get_file_url(self.file_path)
+
+
+class UploadSession(models.Model):
+    """
+    A resumable upload split into fixed-size parts.
+    
+    Parts can be sent in any order and in parallel; every acknowledged part
+    has an UploadPart row, so a client resumes by sending only the missing
+    ones. ``backend`` is 's3' (an S3 multipart upload, ``upload_id``) or
+    'local' (chunk files in default storage).
+    """
+    
+    STATUS_CHOICES = [
+        ('ACTIVE', 'Active'),
+        ('COMPLETING', 'Completing'),
+        ('COMPLETED', 'Completed'),
+        ('ABORTED', 'Aborted'),
+    ]
+    
+    BACKEND_CHOICES = [
+        ('s3', 'S3 multipart'),
+        ('local', 'Local chunks'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    idea = models.ForeignKey(Idea, on_delete=models.CASCADE, related_name='upload_sessions')
+    uploaded_by = models.ForeignKey('auth.User', on_delete=models.CASCADE, related_name='upload_sessions')
+    file_name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    file_size = models.BigIntegerField()
+    part_size = models.IntegerField()
+    key = models.CharField(max_length=500)
+    backend = models.CharField(max_length=10, choices=BACKEND_CHOICES)
+    upload_id = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ACTIVE')
+    document = models.OneToOneField(
+        Document, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_session'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Stale-session cleanup scans active sessions by expiry
+            models.Index(fields=['status', 'expires_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
+    
+    @property
+    def part_count(self):
+        """Number of parts the file is split into."""
+        return -(-self.file_size // self.part_size)
+    
+    def expected_part_size(self, number):
+        """Size of part ``number`` (1-based); only the last part may be shorter."""
+        if number < self.part_count:
+            return self.part_size
+        return self.file_size - self.part_size * (self.part_count - 1)
+
+
+class UploadPart(models.Model):
+    """An acknowledged part of an UploadSession."""
+    
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name='parts')
+    number = models.PositiveIntegerField()
+    size = models.BigIntegerField()
+    etag = models.CharField(max_length=255, blank=True)
+    uploaded_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['number']
+        unique_together = ['session', 'number']
+    
+    def __str__(self):
+        return f"Part {self.number} of {self.session_id}"
@@ -2,8 +2,13 @@
 Serializers for Documents app.
 """
 
+from django.conf import settings
+from django.core import signing
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from .models import Document
+from .models import Document, UploadSession
+
+UPLOAD_TOKEN_SALT = 'documents.upload'
 
 
 class DocumentSerializer(serializers.ModelSerializer):
@@ -50,11 +55,11 @@ class DocumentUploadSerializer(serializers.Serializer):
         return value
     
     def create(self, validated_data):
-        """Create document."""
+        """Create document, storing the file once per distinct content."""
         from ideas.models import Idea
-        from common.utils import upload_file_to_s3, sanitize_filename
+        from common.exceptions import VirusDetectedError
         from celery_tasks.file_tasks import scan_uploaded_file
-        import uuid
+        from .blobs import blob_reference, uploaded_sha256
         
         file = validated_data['file']
         idea_id = validated_data['idea_id']
@@ -65,25 +70,247 @@ class DocumentUploadSerializer(serializers.Serializer):
         except Idea.DoesNotExist:
             raise serializers.ValidationError("Idea not found")
         
-        # Sanitize filename
-        file_name = sanitize_filename(file.name)
-        unique_file_name = f"{uuid.uuid4()}_{file_name}"
+        request = self.context['request']
+        sha256 = uploaded_sha256(request, 'file', file)
         
-        # Upload file to S3
-        file_path = upload_file_to_s3(file, unique_file_name)
+        # Identical content keeps the verdict of its earlier scan
+        known_status = (
+            Document.objects.filter(blob_id=sha256)
+            .exclude(virus_scan_status='PENDING')
+            .values_list('virus_scan_status', flat=True)
+            .first()
+        )
+        if known_status == 'INFECTED':
+            raise VirusDetectedError()
         
-        # Create document
-        document = Document.objects.create(
-            idea=idea,
-            file_name=file.name,
-            file_path=file_path,
-            file_size=file.size,
-            file_type=file.name.split('.')[-1].lower(),
-            uploaded_by=self.context['request'].user,
-            virus_scan_status='PENDING'
+        # Store the file unless the same content is already stored
+        with blob_reference(file, sha256) as blob:
+            # Create document
+            document = Document.objects.create(
+                idea=idea,
+                file_name=file.name,
+                file_path=blob.path,
+                file_size=file.size,
+                file_type=file.name.split('.')[-1].lower(),
+                uploaded_by=request.user,
+                virus_scan_status=known_status or 'PENDING',
+                blob=blob
+            )
+            
+            # Queue virus scan for content not seen before, once the row is visible to workers
+            if known_status is None:
+                transaction.on_commit(lambda: scan_uploaded_file.delay(str(document.id)))
+        
+        return document
+
+
+class DocumentPresignSerializer(serializers.Serializer):
+    """Serializer for requesting a presigned direct-to-S3 upload."""
+    
+    idea_id = serializers.UUIDField(required=True)
+    file_name = serializers.CharField(max_length=255)
+    file_size = serializers.IntegerField(min_value=1)
+    content_type = serializers.CharField(max_length=100)
+    
+    def validate_file_name(self, value):
+        """Validate file type."""
+        from common.utils import validate_file_type
+        
+        try:
+            validate_file_type(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+    
+    def validate_file_size(self, value):
+        """Validate file size against the presigned size condition."""
+        if value > settings.DOCUMENT_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"File size exceeds {settings.DOCUMENT_UPLOAD_MAX_SIZE // (1024 * 1024)}MB limit"
+            )
+        return value
+    
+    def validate_idea_id(self, value):
+        """Validate idea exists."""
+        from ideas.models import Idea
+        
+        if not Idea.objects.filter(id=value).exists():
+            raise serializers.ValidationError("Idea not found")
+        return value
+    
+    def create(self, validated_data):
+        """Presign a POST for a new object key and sign the matching completion token."""
+        from common.utils import create_presigned_upload, sanitize_filename
+        import uuid
+        
+        key = f"ideas/{uuid.uuid4()}_{sanitize_filename(validated_data['file_name'])}"
+        expires_in = settings.DOCUMENT_PRESIGN_EXPIRES
+        upload = create_presigned_upload(
+            key,
+            validated_data['content_type'],
+            settings.DOCUMENT_UPLOAD_MAX_SIZE,
+            expires_in
         )
         
-        # Queue virus scan
-        scan_uploaded_file.delay(str(document.id))
+        upload_token = signing.dumps({
+            'key': key,
+            'idea_id': str(validated_data['idea_id']),
+            'file_name': validated_data['file_name'],
+            'content_type': validated_data['content_type'],
+            'user_id': self.context['request'].user.pk,
+        }, salt=UPLOAD_TOKEN_SALT)
+        
+        return {
+            'url': upload['url'],
+            'fields': upload['fields'],
+            'key': key,
+            'upload_token': upload_token,
+            'expires_in': expires_in,
+        }
+
+
+class DocumentCompleteSerializer(serializers.Serializer):
+    """Serializer for registering a document uploaded directly to S3."""
+    
+    upload_token = serializers.CharField()
+    
+    def validate_upload_token(self, value):
+        """Unsign the token issued by DocumentPresignSerializer for this user."""
+        # Allow completion for one more presign period after the POST expires
+        max_age = 2 * settings.DOCUMENT_PRESIGN_EXPIRES
+        try:
+            upload = signing.loads(value, salt=UPLOAD_TOKEN_SALT, max_age=max_age)
+        except signing.BadSignature:
+            raise serializers.ValidationError("Invalid or expired upload token")
+        
+        if upload['user_id'] != self.context['request'].user.pk:
+            raise serializers.ValidationError("Upload token was issued to another user")
+        return upload
+    
+    def create(self, validated_data):
+        """Verify the object with a HEAD, then create the document and queue its scan."""
+        from ideas.models import Idea
+        from common.utils import head_s3_object
+        from celery_tasks.file_tasks import scan_uploaded_file
+        
+        upload = validated_data['upload_token']
+        
+        # Completing twice returns the document created the first time
+        self.created = False
+        document = self._completed_document(upload['key'])
+        if document is not None:
+            return document
+        
+        head = head_s3_object(upload['key'])
+        if head is None:
+            raise serializers.ValidationError({'upload_token': ["File has not been uploaded"]})
+        if head['ContentLength'] > settings.DOCUMENT_UPLOAD_MAX_SIZE or head.get('ContentType') != upload['content_type']:
+            raise serializers.ValidationError({'upload_token': ["Uploaded file does not match the presigned upload"]})
+        
+        try:
+            idea = Idea.objects.get(id=upload['idea_id'])
+        except Idea.DoesNotExist:
+            raise serializers.ValidationError("Idea not found")
+        
+        try:
+            with transaction.atomic():
+                document = Document.objects.create(
+                    idea=idea,
+                    file_name=upload['file_name'],
+                    file_path=upload['key'],
+                    file_size=head['ContentLength'],
+                    file_type=upload['file_name'].split('.')[-1].lower(),
+                    uploaded_by=self.context['request'].user,
+                    virus_scan_status='PENDING'
+                )
+        except IntegrityError:
+            # A concurrent complete for the same key created it first
+            return self._completed_document(upload['key'])
+        self.created = True
+        
+        # Queue virus scan once the row is visible to workers
+        transaction.on_commit(lambda: scan_uploaded_file.delay(str(document.id)))
         
         return document
+    
+    @staticmethod
+    def _completed_document(key):
+        """Return the document already created for an upload key, through its unique index."""
+        return Document.objects.filter(file_path=key, blob__isnull=True).first()
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer for a resumable upload and its acknowledged parts."""
+    
+    part_count = serializers.IntegerField(read_only=True)
+    uploaded_parts = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'idea', 'file_name', 'content_type', 'file_size', 'part_size', 'part_count',
+            'backend', 'status', 'uploaded_parts', 'document', 'created_at', 'expires_at'
+        ]
+        read_only_fields = fields
+    
+    def get_uploaded_parts(self, obj):
+        """Numbers of the parts acknowledged so far; a resuming client sends the rest."""
+        return [part.number for part in obj.parts.all()]
+
+
+class UploadSessionCreateSerializer(serializers.Serializer):
+    """Serializer for starting a resumable upload."""
+    
+    idea_id = serializers.UUIDField(required=True)
+    file_name = serializers.CharField(max_length=255)
+    file_size = serializers.IntegerField(min_value=1)
+    content_type = serializers.CharField(max_length=100)
+    
+    def validate_file_name(self, value):
+        """Validate file type."""
+        from common.utils import validate_file_type
+        
+        try:
+            validate_file_type(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+    
+    def validate_file_size(self, value):
+        """Validate file size against the resumable upload limit."""
+        if value > settings.DOCUMENT_RESUMABLE_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"File size exceeds {settings.DOCUMENT_RESUMABLE_MAX_SIZE // (1024 * 1024)}MB limit"
+            )
+        return value
+    
+    def validate_idea_id(self, value):
+        """Validate idea exists."""
+        from ideas.models import Idea
+        
+        if not Idea.objects.filter(id=value).exists():
+            raise serializers.ValidationError("Idea not found")
+        return value
+    
+    def create(self, validated_data):
+        """Create the session and open it on the configured backend."""
+        from datetime import timedelta
+        from django.utils import timezone
+        from common.utils import sanitize_filename
+        from .uploads import get_upload_backend
+        import uuid
+        
+        session = UploadSession(
+            idea_id=validated_data['idea_id'],
+            uploaded_by=self.context['request'].user,
+            file_name=validated_data['file_name'],
+            content_type=validated_data['content_type'],
+            file_size=validated_data['file_size'],
+            part_size=settings.DOCUMENT_UPLOAD_PART_SIZE,
+            key=f"ideas/{uuid.uuid4()}_{sanitize_filename(validated_data['file_name'])}",
+            backend=settings.DOCUMENT_UPLOAD_BACKEND,
+            expires_at=timezone.now() + timedelta(hours=settings.DOCUMENT_UPLOAD_SESSION_HOURS)
+        )
+        get_upload_backend(session.backend).start(session)
+        session.save()
+        return session
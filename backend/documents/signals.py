@@ -0,0 +1,22 @@
+"""
+Signal handlers for Documents app.
+"""
+
+from django.db.models.signals import post_save, post_delete
+
+from ideas.signals import document_saved, document_deleted
+from .blobs import release_blob
+from .models import Document
+
+# Uploaded documents count towards Idea.document_count like ideas.Document
+post_save.connect(document_saved, sender=Document, dispatch_uid='documents.document_saved')
+post_delete.connect(document_deleted, sender=Document, dispatch_uid='documents.document_deleted')
+
+
+def release_document_blob(sender, instance, **kwargs):
+    """Drop the deleted document's reference to its shared blob."""
+    if instance.blob_id:
+        release_blob(instance.blob_id)
+
+
+post_delete.connect(release_document_blob, sender=Document, dispatch_uid='documents.release_document_blob')
@@ -8,7 +8,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework.test import APIClient
 from rest_framework import status
 from ideas.models import Idea, Campaign, Contributor
-from .models import Document
+from .models import Document, UploadSession
 from datetime import datetime, timedelta
 
 
@@ -228,3 +228,529 @@ class TestDocumentViewSet:
         response = api_client.post('/api/v1/documents/upload/', data, format='multipart')
         
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Point the shared Redis client at an in-memory fake."""
+    import fakeredis
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr('common.redis_client._client', client)
+    return client
+
+
+class TestUploadThrottle:
+    """Tests for the Redis-backed 'uploads' throttle scope."""
+    
+    @pytest.fixture(autouse=True)
+    def upload_rate(self, monkeypatch):
+        """Allow two uploads per hour."""
+        from common.throttling import RedisScopedRateThrottle
+        monkeypatch.setattr(RedisScopedRateThrottle, 'THROTTLE_RATES', {'uploads': '2/hour'})
+    
+    def test_upload_scope_limits_requests(self, api_client, user, idea, fake_redis):
+        """Test the upload budget is enforced with a Retry-After hint."""
+        api_client.force_authenticate(user=user)
+        data = {'idea_id': str(idea.id)}
+        
+        responses = [
+            api_client.post('/api/v1/documents/upload/', data, format='multipart')
+            for _ in range(3)
+        ]
+        
+        assert [response.status_code for response in responses[:2]] == [status.HTTP_400_BAD_REQUEST] * 2
+        assert responses[2].status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(responses[2]['Retry-After']) > 0
+        # GCRA keeps one value per client and scope
+        assert fake_redis.type(f'throttle:throttle_uploads_{user.pk}') == 'string'
+    
+    def test_other_endpoints_not_limited_by_upload_scope(self, api_client, user, idea, fake_redis):
+        """Test the upload scope does not apply to other document views."""
+        api_client.force_authenticate(user=user)
+        
+        for _ in range(3):
+            response = api_client.get('/api/v1/documents/')
+        
+        assert response.status_code == status.HTTP_200_OK
+    
+    def test_throttle_fails_open_without_redis(self, api_client, user, idea, monkeypatch):
+        """Test requests are allowed when Redis is unreachable."""
+        import fakeredis
+        server = fakeredis.FakeServer()
+        server.connected = False
+        monkeypatch.setattr('common.redis_client._client', fakeredis.FakeRedis(server=server))
+        api_client.force_authenticate(user=user)
+        data = {'idea_id': str(idea.id)}
+        
+        for _ in range(3):
+            response = api_client.post('/api/v1/documents/upload/', data, format='multipart')
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.fixture
+def s3(settings):
+    """Mocked S3 bucket standing in for the document bucket."""
+    from moto import mock_s3
+    from common.utils import get_s3_client
+    settings.AWS_STORAGE_BUCKET_NAME = 'test-bucket'
+    settings.AWS_ACCESS_KEY_ID = 'testing'
+    settings.AWS_SECRET_ACCESS_KEY = 'testing'
+    settings.AWS_S3_ENDPOINT_URL = None
+    with mock_s3():
+        client = get_s3_client()
+        client.create_bucket(Bucket='test-bucket')
+        yield client
+
+
+class TestPresignedUpload:
+    """Tests for the presign/complete direct-to-S3 upload flow."""
+    
+    def presign(self, api_client, idea, **overrides):
+        """Request a presigned upload for the idea."""
+        data = {
+            'idea_id': str(idea.id),
+            'file_name': 'report.pdf',
+            'file_size': 1024,
+            'content_type': 'application/pdf',
+            **overrides
+        }
+        return api_client.post('/api/v1/documents/presign/', data, format='json')
+    
+    def test_presign_returns_post_policy(self, api_client, user, idea, s3):
+        """Test the presigned POST targets the bucket with a content type condition."""
+        api_client.force_authenticate(user=user)
+        
+        response = self.presign(api_client, idea)
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['key'].startswith('ideas/')
+        assert response.data['key'].endswith('_report.pdf')
+        assert response.data['fields']['Content-Type'] == 'application/pdf'
+        assert 'policy' in response.data['fields']
+        assert response.data['upload_token']
+    
+    def test_presign_rejects_large_and_disallowed_files(self, api_client, user, idea, s3, settings):
+        """Test size and file type are validated before presigning."""
+        api_client.force_authenticate(user=user)
+        
+        too_large = self.presign(api_client, idea, file_size=settings.DOCUMENT_UPLOAD_MAX_SIZE + 1)
+        bad_type = self.presign(api_client, idea, file_name='script.exe')
+        
+        assert too_large.status_code == status.HTTP_400_BAD_REQUEST
+        assert bad_type.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_complete_creates_document_and_queues_scan(self, api_client, user, idea, s3,
+                                                       django_capture_on_commit_callbacks):
+        """Test completion verifies the object and creates the document once."""
+        api_client.force_authenticate(user=user)
+        presigned = self.presign(api_client, idea).data
+        s3.put_object(Bucket='test-bucket', Key=presigned['key'], Body=b'x' * 512, ContentType='application/pdf')
+        
+        with django_capture_on_commit_callbacks() as callbacks:
+            response = api_client.post('/api/v1/documents/complete/', {
+                'upload_token': presigned['upload_token']
+            }, format='json')
+        repeat = api_client.post('/api/v1/documents/complete/', {
+            'upload_token': presigned['upload_token']
+        }, format='json')
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['file_size'] == 512
+        assert response.data['file_path'] == presigned['key']
+        assert len(callbacks) == 1
+        assert repeat.status_code == status.HTTP_200_OK
+        assert repeat.data['id'] == response.data['id']
+        assert Document.objects.filter(file_path=presigned['key']).count() == 1
+    
+    def test_concurrent_complete_returns_existing_document(self, api_client, user, idea, s3, monkeypatch):
+        """Test a complete that loses the race to the unique file_path returns the winner's document."""
+        from .serializers import DocumentCompleteSerializer
+        api_client.force_authenticate(user=user)
+        presigned = self.presign(api_client, idea).data
+        s3.put_object(Bucket='test-bucket', Key=presigned['key'], Body=b'x' * 512, ContentType='application/pdf')
+        winner = Document.objects.create(
+            idea=idea,
+            file_name='report.pdf',
+            file_path=presigned['key'],
+            file_size=512,
+            file_type='pdf',
+            uploaded_by=user
+        )
+        # The first lookup runs before the concurrent complete commits
+        lookups = []
+        real_lookup = DocumentCompleteSerializer._completed_document
+        
+        def racing_lookup(key):
+            lookups.append(key)
+            return real_lookup(key) if len(lookups) > 1 else None
+        monkeypatch.setattr(DocumentCompleteSerializer, '_completed_document', staticmethod(racing_lookup))
+        
+        response = api_client.post('/api/v1/documents/complete/', {
+            'upload_token': presigned['upload_token']
+        }, format='json')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['id'] == str(winner.id)
+        assert Document.objects.filter(file_path=presigned['key']).count() == 1
+    
+    def test_complete_requires_uploaded_object(self, api_client, user, idea, s3):
+        """Test completion fails when nothing was uploaded."""
+        api_client.force_authenticate(user=user)
+        presigned = self.presign(api_client, idea).data
+        
+        response = api_client.post('/api/v1/documents/complete/', {
+            'upload_token': presigned['upload_token']
+        }, format='json')
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Document.objects.exists()
+    
+    def test_complete_rejects_mismatched_content_type(self, api_client, user, idea, s3):
+        """Test the uploaded object must match the presigned content type."""
+        api_client.force_authenticate(user=user)
+        presigned = self.presign(api_client, idea).data
+        s3.put_object(Bucket='test-bucket', Key=presigned['key'], Body=b'x', ContentType='text/html')
+        
+        response = api_client.post('/api/v1/documents/complete/', {
+            'upload_token': presigned['upload_token']
+        }, format='json')
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_complete_rejects_other_users_token(self, api_client, user, idea, s3):
+        """Test an upload token only completes for the user it was issued to."""
+        api_client.force_authenticate(user=user)
+        presigned = self.presign(api_client, idea).data
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass123')
+        
+        api_client.force_authenticate(user=other)
+        response = api_client.post('/api/v1/documents/complete/', {
+            'upload_token': presigned['upload_token']
+        }, format='json')
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestResumableUpload:
+    """Tests for resumable chunked uploads."""
+    
+    @pytest.fixture
+    def local_uploads(self, settings, tmp_path):
+        """Use the local chunk backend with 4-byte parts."""
+        settings.DOCUMENT_UPLOAD_BACKEND = 'local'
+        settings.DOCUMENT_UPLOAD_PART_SIZE = 4
+        settings.MEDIA_ROOT = str(tmp_path)
+        return tmp_path
+    
+    def start(self, api_client, idea, file_size=10):
+        """Start an upload session for the idea."""
+        return api_client.post('/api/v1/documents/uploads/', {
+            'idea_id': str(idea.id),
+            'file_name': 'notes.txt',
+            'file_size': file_size,
+            'content_type': 'text/plain'
+        }, format='json')
+    
+    def put_part(self, api_client, session_id, number, chunk):
+        """Send one part's bytes."""
+        return api_client.put(
+            f'/api/v1/documents/uploads/{session_id}/parts/{number}/',
+            chunk,
+            content_type='application/octet-stream'
+        )
+    
+    def test_local_upload_resumes_missing_parts(self, api_client, user, idea, local_uploads,
+                                                django_capture_on_commit_callbacks):
+        """Test parts arrive out of order, resume from the acknowledged list and join in order."""
+        api_client.force_authenticate(user=user)
+        session = self.start(api_client, idea).data
+        assert session['part_count'] == 3
+        
+        self.put_part(api_client, session['id'], 3, b'89')
+        self.put_part(api_client, session['id'], 1, b'0123')
+        resumed = api_client.get(f"/api/v1/documents/uploads/{session['id']}/")
+        incomplete = api_client.post(f"/api/v1/documents/uploads/{session['id']}/complete/")
+        
+        assert resumed.data['uploaded_parts'] == [1, 3]
+        assert incomplete.status_code == status.HTTP_400_BAD_REQUEST
+        assert incomplete.data['missing_parts'] == [2]
+        
+        self.put_part(api_client, session['id'], 2, b'4567')
+        with django_capture_on_commit_callbacks() as callbacks:
+            response = api_client.post(f"/api/v1/documents/uploads/{session['id']}/complete/")
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['file_size'] == 10
+        assert (local_uploads / response.data['file_path']).read_bytes() == b'0123456789'
+        assert len(callbacks) == 1
+        assert UploadSession.objects.get(id=session['id']).status == 'COMPLETED'
+    
+    def test_failed_join_leaves_session_resumable(self, api_client, user, idea, local_uploads, monkeypatch):
+        """Test a storage error while joining releases the COMPLETING claim."""
+        from common.exceptions import FileUploadError
+        from .uploads import LocalChunkBackend
+        api_client.force_authenticate(user=user)
+        session = self.start(api_client, idea, file_size=4).data
+        self.put_part(api_client, session['id'], 1, b'0123')
+        
+        def fail(backend, session, parts):
+            raise FileUploadError('storage unavailable')
+        monkeypatch.setattr(LocalChunkBackend, 'complete', fail)
+        
+        response = api_client.post(f"/api/v1/documents/uploads/{session['id']}/complete/")
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert UploadSession.objects.get(id=session['id']).status == 'ACTIVE'
+    
+    def test_completing_session_refuses_second_complete(self, api_client, user, idea, local_uploads):
+        """Test a complete already joining the parts is not run twice."""
+        api_client.force_authenticate(user=user)
+        session = self.start(api_client, idea, file_size=4).data
+        self.put_part(api_client, session['id'], 1, b'0123')
+        UploadSession.objects.filter(id=session['id']).update(status='COMPLETING')
+        
+        response = api_client.post(f"/api/v1/documents/uploads/{session['id']}/complete/")
+        
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert not Document.objects.exists()
+    
+    def test_local_part_size_enforced(self, api_client, user, idea, local_uploads):
+        """Test a part must have exactly its expected size."""
+        api_client.force_authenticate(user=user)
+        session = self.start(api_client, idea).data
+        
+        response = self.put_part(api_client, session['id'], 1, b'01')
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_aborted_upload_refuses_parts(self, api_client, user, idea, local_uploads):
+        """Test DELETE aborts the session and later parts are refused."""
+        api_client.force_authenticate(user=user)
+        session = self.start(api_client, idea).data
+        self.put_part(api_client, session['id'], 1, b'0123')
+        
+        response = api_client.delete(f"/api/v1/documents/uploads/{session['id']}/")
+        
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert self.put_part(api_client, session['id'], 2, b'4567').status_code == status.HTTP_409_CONFLICT
+        assert not (local_uploads / 'uploads' / session['id'] / '00001').exists()
+    
+    def test_sessions_private_to_uploader(self, api_client, user, idea, local_uploads):
+        """Test other users cannot see or feed someone else's session."""
+        api_client.force_authenticate(user=user)
+        session = self.start(api_client, idea).data
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass123')
+        
+        api_client.force_authenticate(user=other)
+        
+        assert api_client.get(f"/api/v1/documents/uploads/{session['id']}/").status_code == status.HTTP_404_NOT_FOUND
+        assert self.put_part(api_client, session['id'], 1, b'0123').status_code == status.HTTP_404_NOT_FOUND
+    
+    def test_s3_multipart_upload(self, api_client, user, idea, s3, settings):
+        """Test parts go to presigned S3 URLs and are joined by complete_multipart_upload."""
+        import requests
+        settings.DOCUMENT_UPLOAD_BACKEND = 's3'
+        api_client.force_authenticate(user=user)
+        session = self.start(api_client, idea).data
+        
+        urls = api_client.get(f"/api/v1/documents/uploads/{session['id']}/part_urls/").data['parts']
+        etag = requests.put(urls[0]['url'], data=b'0123456789').headers['ETag']
+        ack = api_client.put(f"/api/v1/documents/uploads/{session['id']}/parts/1/", {'etag': etag}, format='json')
+        response = api_client.post(f"/api/v1/documents/uploads/{session['id']}/complete/")
+        
+        assert [part['number'] for part in urls] == [1]
+        assert ack.status_code == status.HTTP_200_OK
+        assert response.status_code == status.HTTP_201_CREATED
+        assert s3.head_object(Bucket='test-bucket', Key=response.data['file_path'])['ContentLength'] == 10
+
+
+class TestContentAddressedStorage:
+    """Tests for storing identical uploads once with reference counts."""
+    
+    @pytest.fixture
+    def media(self, settings, tmp_path):
+        """Store uploads under a temporary MEDIA_ROOT."""
+        settings.MEDIA_ROOT = str(tmp_path)
+        return tmp_path
+    
+    @pytest.fixture
+    def other_idea(self, user, campaign):
+        """Create a second idea to attach the same file to."""
+        return Idea.objects.create(
+            title='Other Idea',
+            description='Other idea description',
+            expected_impact='LOW',
+            submitter=user,
+            campaign=campaign,
+            status='SUBMITTED'
+        )
+    
+    @pytest.fixture
+    def scans(self, monkeypatch):
+        """Record queued virus scans instead of running them."""
+        from celery_tasks.file_tasks import scan_uploaded_file
+        queued = []
+        monkeypatch.setattr(scan_uploaded_file, 'delay', queued.append)
+        return queued
+    
+    @pytest.fixture
+    def purges(self, monkeypatch):
+        """Record queued blob purges instead of running them."""
+        from celery_tasks.file_tasks import purge_unreferenced_blob
+        queued = []
+        monkeypatch.setattr(purge_unreferenced_blob, 'delay', queued.append)
+        return queued
+    
+    def upload(self, api_client, idea, content=b'same bytes'):
+        """Upload a PDF with the given content to the idea."""
+        data = {
+            'file': SimpleUploadedFile('report.pdf', content, content_type='application/pdf'),
+            'idea_id': str(idea.id)
+        }
+        return api_client.post('/api/v1/documents/upload/', data, format='multipart')
+    
+    def test_identical_content_stored_once(self, api_client, user, idea, other_idea, media, scans):
+        """Test the same bytes on two ideas share one object and reference count."""
+        from .models import StoredBlob
+        api_client.force_authenticate(user=user)
+        
+        first = self.upload(api_client, idea)
+        second = self.upload(api_client, other_idea)
+        different = self.upload(api_client, idea, content=b'other bytes')
+        
+        blob = StoredBlob.objects.get(path=first.data['file_path'])
+        assert blob.path == f'blobs/{blob.sha256[:2]}/{blob.sha256}.pdf'
+        assert second.data['file_path'] == first.data['file_path']
+        assert different.data['file_path'] != first.data['file_path']
+        assert blob.ref_count == 2
+        assert (media / blob.path).read_bytes() == b'same bytes'
+    
+    def test_idempotency_key_covers_file_contents(self, api_client, user, idea, media, scans):
+        """Test a key reused for a different file of the same name and size is rejected."""
+        api_client.force_authenticate(user=user)
+        
+        def upload(content):
+            data = {
+                'file': SimpleUploadedFile('report.pdf', content, content_type='application/pdf'),
+                'idea_id': str(idea.id)
+            }
+            return api_client.post('/api/v1/documents/upload/', data, format='multipart',
+                                   HTTP_IDEMPOTENCY_KEY='upload-1')
+        
+        first = upload(b'same bytes')
+        retried = upload(b'same bytes')
+        different = upload(b'diff bytes')
+        
+        assert retried.status_code == status.HTTP_201_CREATED
+        assert retried['Idempotent-Replayed'] == 'true'
+        assert retried.data == first.data
+        assert different.status_code == 422
+        assert Document.objects.filter(idea=idea).count() == 1
+    
+    def test_object_deleted_with_last_reference(self, api_client, user, idea, other_idea, media, scans, purges,
+                                                django_capture_on_commit_callbacks):
+        """Test deleting a document keeps shared content until its last reference goes."""
+        from .blobs import purge_blob
+        from .models import StoredBlob
+        api_client.force_authenticate(user=user)
+        first = self.upload(api_client, idea)
+        second = self.upload(api_client, other_idea)
+        path = first.data['file_path']
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            Document.objects.get(id=first.data['id']).delete()
+        
+        assert StoredBlob.objects.get(path=path).ref_count == 1
+        assert purges == []
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            Document.objects.get(id=second.data['id']).delete()
+        
+        assert purges == [StoredBlob.objects.get(path=path).sha256]
+        assert (media / path).exists()
+        
+        assert purge_blob(purges[0]) is True
+        assert not StoredBlob.objects.filter(path=path).exists()
+        assert not (media / path).exists()
+    
+    def test_reference_taken_before_purge_keeps_object(self, api_client, user, idea, other_idea, media, scans,
+                                                       purges, django_capture_on_commit_callbacks):
+        """Test a queued purge leaves content alone once a new upload references it again."""
+        from .blobs import purge_blob
+        from .models import StoredBlob
+        api_client.force_authenticate(user=user)
+        first = self.upload(api_client, idea)
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            Document.objects.get(id=first.data['id']).delete()
+        second = self.upload(api_client, other_idea)
+        
+        assert second.data['file_path'] == first.data['file_path']
+        assert purge_blob(purges[0]) is False
+        assert StoredBlob.objects.get(sha256=purges[0]).ref_count == 1
+        assert (media / second.data['file_path']).read_bytes() == b'same bytes'
+    
+    def test_upload_after_purge_stores_content_again(self, api_client, user, idea, other_idea, media, scans,
+                                                     purges, django_capture_on_commit_callbacks, monkeypatch):
+        """Test content purged between the lookup and the new reference is written back."""
+        from . import blobs
+        from .models import StoredBlob
+        api_client.force_authenticate(user=user)
+        first = self.upload(api_client, idea)
+        with django_capture_on_commit_callbacks(execute=True):
+            Document.objects.get(id=first.data['id']).delete()
+        
+        take_reference = blobs._take_reference
+        
+        def purge_first(sha256, path, size):
+            blobs.purge_blob(sha256)
+            return take_reference(sha256, path, size)
+        
+        monkeypatch.setattr(blobs, '_take_reference', purge_first)
+        second = self.upload(api_client, other_idea)
+        
+        assert second.status_code == status.HTTP_201_CREATED
+        assert StoredBlob.objects.get(path=second.data['file_path']).ref_count == 1
+        assert (media / second.data['file_path']).read_bytes() == b'same bytes'
+    
+    def test_failed_upload_releases_new_content(self, api_client, user, idea, media, scans, monkeypatch):
+        """Test content written for an upload that fails is deleted with its reference."""
+        from .models import StoredBlob
+        api_client.force_authenticate(user=user)
+        
+        def fail(**kwargs):
+            raise RuntimeError('insert failed')
+        monkeypatch.setattr(Document.objects, 'create', fail)
+        
+        with pytest.raises(RuntimeError):
+            self.upload(api_client, idea)
+        
+        assert not StoredBlob.objects.exists()
+        assert not any(path.is_file() for path in media.rglob('*'))
+        assert scans == []
+    
+    def test_known_clean_content_skips_scan(self, api_client, user, idea, other_idea, media, scans,
+                                            django_capture_on_commit_callbacks):
+        """Test a duplicate of scanned clean content reuses the verdict."""
+        api_client.force_authenticate(user=user)
+        with django_capture_on_commit_callbacks(execute=True):
+            first = self.upload(api_client, idea)
+        Document.objects.filter(id=first.data['id']).update(virus_scan_status='CLEAN')
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            second = self.upload(api_client, other_idea)
+        
+        assert second.data['virus_scan_status'] == 'CLEAN'
+        assert scans == [first.data['id']]
+    
+    def test_known_infected_content_rejected(self, api_client, user, idea, other_idea, media, scans):
+        """Test content already found infected is refused without storing a new document."""
+        api_client.force_authenticate(user=user)
+        first = self.upload(api_client, idea)
+        Document.objects.filter(id=first.data['id']).update(virus_scan_status='INFECTED')
+        
+        response = self.upload(api_client, other_idea)
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Document.objects.filter(idea=other_idea).exists()
@@ -0,0 +1,142 @@
+"""
+Resumable upload backends for Documents app.
+
+An UploadSession is split into parts that clients send in any order and in
+parallel. The 's3' backend maps a session onto an S3 multipart upload:
+clients PUT each part straight to a presigned URL and acknowledge it with
+the returned ETag. The 'local' backend (tus-style) receives each part's
+bytes itself, stores them as chunk files in default storage and joins them
+on completion.
+"""
+
+import shutil
+import tempfile
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+from common.exceptions import FileUploadError
+from common.utils import get_s3_client, head_s3_object
+
+
+class S3MultipartBackend:
+    """Upload parts straight to S3 through presigned upload_part URLs."""
+    
+    name = 's3'
+    
+    def start(self, session):
+        """Open the multipart upload and remember its ID on the session."""
+        response = get_s3_client().create_multipart_upload(
+            Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+            Key=session.key,
+            ContentType=session.content_type
+        )
+        session.upload_id = response['UploadId']
+    
+    def part_url(self, session, number, request):
+        """Presign a PUT for one part."""
+        return get_s3_client().generate_presigned_url(
+            'upload_part',
+            Params={
+                'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
+                'Key': session.key,
+                'UploadId': session.upload_id,
+                'PartNumber': number,
+            },
+            ExpiresIn=settings.DOCUMENT_PRESIGN_EXPIRES
+        )
+    
+    def store_part(self, session, number, request):
+        """Acknowledge a part the client uploaded to S3; return (size, etag)."""
+        etag = request.data.get('etag') if hasattr(request.data, 'get') else None
+        if not etag:
+            raise FileUploadError('etag returned by S3 for the part is required')
+        return session.expected_part_size(number), etag
+    
+    def complete(self, session, parts):
+        """Join the acknowledged parts and return the stored object key."""
+        client = get_s3_client()
+        try:
+            client.complete_multipart_upload(
+                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                Key=session.key,
+                UploadId=session.upload_id,
+                MultipartUpload={'Parts': [{'ETag': part.etag, 'PartNumber': part.number} for part in parts]}
+            )
+        except ClientError as e:
+            raise FileUploadError(f"S3 rejected the upload parts: {e.response['Error'].get('Message', str(e))}")
+        
+        head = head_s3_object(session.key)
+        if head is None or head['ContentLength'] != session.file_size:
+            raise FileUploadError('Uploaded object does not match the declared file size')
+        return session.key
+    
+    def abort(self, session):
+        """Abort the multipart upload so S3 drops the stored parts."""
+        try:
+            get_s3_client().abort_multipart_upload(
+                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                Key=session.key,
+                UploadId=session.upload_id
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'NoSuchUpload':
+                raise
+
+
+class LocalChunkBackend:
+    """Receive parts through the API and keep them as chunk files in default storage."""
+    
+    name = 'local'
+    
+    def chunk_path(self, session, number):
+        """Storage path of one part's chunk file."""
+        return f'uploads/{session.pk}/{number:05d}'
+    
+    def start(self, session):
+        """Nothing to open; chunks are created as they arrive."""
+    
+    def part_url(self, session, number, request):
+        """Return this API's own part endpoint."""
+        return request.build_absolute_uri(reverse('upload-session-part', args=[session.pk, number]))
+    
+    def store_part(self, session, number, request):
+        """Stream the request body into the part's chunk file; return (size, etag)."""
+        expected = session.expected_part_size(number)
+        if request.META.get('CONTENT_LENGTH') != str(expected):
+            raise FileUploadError(f'Part {number} must be exactly {expected} bytes')
+        
+        # A resent part replaces the earlier attempt
+        path = self.chunk_path(session, number)
+        default_storage.delete(path)
+        saved = default_storage.save(path, File(request.stream))
+        if default_storage.size(saved) != expected:
+            default_storage.delete(saved)
+            raise FileUploadError(f'Part {number} was truncated; resend it')
+        return expected, ''
+    
+    def complete(self, session, parts):
+        """Concatenate the chunks in order into the final file and return its path."""
+        with tempfile.TemporaryFile() as joined:
+            for part in parts:
+                with default_storage.open(self.chunk_path(session, part.number), 'rb') as chunk:
+                    shutil.copyfileobj(chunk, joined)
+            joined.seek(0)
+            path = default_storage.save(session.key, File(joined))
+        self.abort(session)
+        return path
+    
+    def abort(self, session):
+        """Delete the session's chunk files."""
+        for number in range(1, session.part_count + 1):
+            default_storage.delete(self.chunk_path(session, number))
+
+
+UPLOAD_BACKENDS = {backend.name: backend for backend in (S3MultipartBackend(), LocalChunkBackend())}
+
+
+def get_upload_backend(name):
+    """Return the backend serving sessions with the given ``backend`` name."""
+    return UPLOAD_BACKENDS[name]
@@ -4,9 +4,11 @@ URL configuration for Documents app.
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import DocumentViewSet
+from .views import DocumentViewSet, UploadSessionViewSet
 
 router = DefaultRouter()
+# Registered first so 'uploads/' is not taken for a document ID
+router.register(r'uploads', UploadSessionViewSet, basename='upload-session')
 router.register(r'', DocumentViewSet, basename='document')
 
 urlpatterns = [
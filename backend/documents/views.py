@@ -2,15 +2,22 @@
 Views for Documents app.
 """
 
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import Document
-from .serializers import DocumentSerializer, DocumentUploadSerializer
+from .models import Document, UploadPart, UploadSession
+from .serializers import (
+    DocumentSerializer, DocumentUploadSerializer, DocumentPresignSerializer, DocumentCompleteSerializer,
+    UploadSessionSerializer, UploadSessionCreateSerializer
+)
+from .uploads import get_upload_backend
 from ideas.permissions import IsSubmitterOrReadOnly
+from common.exceptions import ConflictError
+from common.idempotency import idempotent
 
 
 class DocumentViewSet(viewsets.ModelViewSet):
@@ -21,6 +28,8 @@ class DocumentViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsSubmitterOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['idea', 'virus_scan_status']
+    # Unscoped by default; actions opt into a tighter RedisScopedRateThrottle budget
+    throttle_scope = None
     
     def get_serializer_class(self):
         """Return appropriate serializer based on action."""
@@ -28,7 +37,8 @@ class DocumentViewSet(viewsets.ModelViewSet):
             return DocumentUploadSerializer
         return DocumentSerializer
     
-    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated], throttle_scope='uploads')
+    @idempotent('documents.upload')
     def upload(self, request):
         """Upload a file."""
         serializer = DocumentUploadSerializer(
@@ -43,6 +53,28 @@ class DocumentViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated], throttle_scope='uploads')
+    def presign(self, request):
+        """Get a presigned POST for uploading a file straight to S3."""
+        serializer = DocumentPresignSerializer(data=request.data, context={'request': request})
+        if serializer.is_valid():
+            return Response(serializer.save(), status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    @idempotent('documents.complete')
+    def complete(self, request):
+        """Register a file uploaded with a presigned POST."""
+        serializer = DocumentCompleteSerializer(data=request.data, context={'request': request})
+        if serializer.is_valid():
+            document = serializer.save()
+            response_serializer = DocumentSerializer(document)
+            return Response(
+                response_serializer.data,
+                status=status.HTTP_201_CREATED if serializer.created else status.HTTP_200_OK
+            )
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
     def download(self, request, pk=None):
         """Download a file."""
@@ -67,3 +99,157 @@ class DocumentViewSet(viewsets.ModelViewSet):
             'status': document.virus_scan_status,
             'result': document.virus_scan_result
         })
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable uploads: start a session, send parts in any order, then complete.
+    
+    GET on a session lists the acknowledged parts, so an interrupted client
+    resumes by sending only the missing ones. DELETE aborts the upload.
+    """
+    
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+    # Unscoped by default; starting a session spends the 'uploads' budget
+    throttle_scope = None
+    
+    # Most part URLs handed out per part_urls request
+    MAX_PART_URLS = 100
+    
+    def get_queryset(self):
+        """Users only see their own upload sessions."""
+        return UploadSession.objects.filter(uploaded_by=self.request.user).prefetch_related('parts')
+    
+    def get_throttles(self):
+        """Throttle session starts with the 'uploads' scope, not every part."""
+        self.throttle_scope = 'uploads' if self.action == 'create' else None
+        return super().get_throttles()
+    
+    def create(self, request, *args, **kwargs):
+        """Start a resumable upload."""
+        serializer = UploadSessionCreateSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        session = serializer.save()
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+    
+    def destroy(self, request, *args, **kwargs):
+        """Abort an upload and drop its stored parts."""
+        session = self.get_object()
+        if session.status == 'ACTIVE':
+            get_upload_backend(session.backend).abort(session)
+            session.status = 'ABORTED'
+            session.save(update_fields=['status'])
+            session.parts.all().delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    @action(detail=True, methods=['get'])
+    def part_urls(self, request, pk=None):
+        """Get the URLs to PUT parts to (?parts=1,2,3; default: every missing part)."""
+        session = self._active_session()
+        try:
+            numbers = [int(value) for value in request.query_params.get('parts', '').split(',') if value.strip()]
+        except ValueError:
+            return Response(
+                {'error': 'parts must be a comma-separated list of integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not numbers:
+            uploaded = {part.number for part in session.parts.all()}
+            numbers = [number for number in range(1, session.part_count + 1) if number not in uploaded]
+        numbers = numbers[:self.MAX_PART_URLS]
+        if any(number < 1 or number > session.part_count for number in numbers):
+            return Response(
+                {'error': f'Part numbers must be between 1 and {session.part_count}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        backend = get_upload_backend(session.backend)
+        return Response({
+            'parts': [
+                {'number': number, 'size': session.expected_part_size(number),
+                 'url': backend.part_url(session, number, request)}
+                for number in numbers
+            ]
+        })
+    
+    @action(detail=True, methods=['put'], url_path=r'parts/(?P<number>[0-9]+)', url_name='part')
+    def part(self, request, pk=None, number=None):
+        """
+        Acknowledge one part: the raw chunk bytes for 'local' sessions, or
+        {"etag": ...} returned by S3 for 's3' sessions. Resending a part replaces it.
+        """
+        session = self._active_session()
+        number = int(number)
+        if not 1 <= number <= session.part_count:
+            return Response(
+                {'error': f'Part numbers must be between 1 and {session.part_count}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        size, etag = get_upload_backend(session.backend).store_part(session, number, request)
+        UploadPart.objects.update_or_create(
+            session=session,
+            number=number,
+            defaults={'size': size, 'etag': etag}
+        )
+        return Response({'number': number, 'size': size})
+    
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Join the parts, create the document and queue its virus scan."""
+        from celery_tasks.file_tasks import scan_uploaded_file
+        
+        with transaction.atomic():
+            # Lock the session only to claim it, so concurrent completes create one document
+            session = UploadSession.objects.select_for_update().get(pk=self.get_object().pk)
+            if session.status == 'COMPLETED':
+                return Response(DocumentSerializer(session.document).data)
+            if session.status == 'COMPLETING':
+                raise ConflictError('Upload is already being completed')
+            if session.status != 'ACTIVE':
+                return Response({'error': 'Upload was aborted'}, status=status.HTTP_409_CONFLICT)
+            
+            parts = list(session.parts.order_by('number'))
+            missing = sorted(set(range(1, session.part_count + 1)) - {part.number for part in parts})
+            if missing:
+                return Response(
+                    {'error': 'Upload is missing parts', 'missing_parts': missing},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            session.status = 'COMPLETING'
+            session.save(update_fields=['status'])
+        
+        # Joining large uploads takes seconds, so it runs without a transaction open
+        try:
+            file_path = get_upload_backend(session.backend).complete(session, parts)
+        except Exception:
+            # Let the client fix the parts and complete again
+            UploadSession.objects.filter(pk=session.pk, status='COMPLETING').update(status='ACTIVE')
+            raise
+        
+        with transaction.atomic():
+            document = Document.objects.create(
+                idea=session.idea,
+                file_name=session.file_name,
+                file_path=file_path,
+                file_size=session.file_size,
+                file_type=session.file_name.split('.')[-1].lower(),
+                uploaded_by=request.user,
+                virus_scan_status='PENDING'
+            )
+            session.status = 'COMPLETED'
+            session.document = document
+            session.save(update_fields=['status', 'document'])
+            transaction.on_commit(lambda: scan_uploaded_file.delay(str(document.id)))
+        
+        return Response(DocumentSerializer(document).data, status=status.HTTP_201_CREATED)
+    
+    def _active_session(self):
+        """Return the session, refusing parts for completed or aborted uploads."""
+        session = self.get_object()
+        if session.status != 'ACTIVE':
+            raise ConflictError(f'Upload is {session.status.lower()}')
+        return session
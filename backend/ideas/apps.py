@@ -0,0 +1,25 @@
+"""
+App configuration for Ideas app.
+"""
+
+from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import pre_migrate
+
+
+def create_trigram_extension(sender, using, **kwargs):
+    """Enable pg_trgm before tables and the title trigram index are created."""
+    with connections[using].cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+
+class IdeasConfig(AppConfig):
+    """App configuration for Ideas app."""
+    
+    name = 'ideas'
+    
+    def ready(self):
+        """Connect model signal handlers."""
+        from . import signals  # noqa: F401
+        
+        pre_migrate.connect(create_trigram_extension, sender=self)
@@ -0,0 +1,74 @@
+"""
+Streaming idea export for Ideas app.
+
+Rows are read with values_list().iterator(), which uses a server-side
+cursor on PostgreSQL, and encoded one at a time so memory stays flat no
+matter how many ideas are exported.
+"""
+
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_CHUNK_SIZE = 2000
+
+# (output name, queryset lookup) pairs, in output order
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('expected_impact', 'expected_impact'),
+    ('status', 'status'),
+    ('campaign_id', 'campaign_id'),
+    ('campaign_name', 'campaign__name'),
+    ('submitter_username', 'submitter__username'),
+    ('contributor_count', 'contributor_count'),
+    ('document_count', 'document_count'),
+    ('created_at', 'created_at'),
+    ('submitted_at', 'submitted_at'),
+    ('recognized_at', 'recognized_at'),
+]
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """File-like object whose write() returns the value instead of buffering it."""
+    
+    def write(self, value):
+        return value
+
+
+def iter_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield export rows as tuples through a server-side cursor."""
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    return queryset.values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def stream_csv(rows):
+    """Yield CSV lines for the export rows, header first."""
+    writer = csv.writer(Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(rows):
+    """Yield one JSON object per line for the export rows."""
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_export(queryset, export_format):
+    """Return an iterator of encoded export chunks for the given format."""
+    rows = iter_export_rows(queryset)
+    if export_format == 'csv':
+        return stream_csv(rows)
+    if export_format == 'ndjson':
+        return stream_ndjson(rows)
+    raise ValueError(f"Unsupported export format: {export_format}")
@@ -0,0 +1,59 @@
+"""
+Filter backends for Ideas app.
+"""
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+from .permissions import get_contributed_idea_ids
+from .search import SEARCH_CONFIG
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Ranked full-text search over Idea.search_vector.
+    
+    Uses the GIN index on search_vector instead of ILIKE scans and orders
+    results by ts_rank unless the client asked for an explicit ordering.
+    Must be listed after OrderingFilter so the rank ordering is kept.
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, '').strip()
+        if not terms:
+            return queryset
+        
+        query = SearchQuery(terms, search_type='websearch', config=SEARCH_CONFIG)
+        queryset = queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        )
+        
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+        return queryset.order_by('-search_rank', '-created_at')
+
+
+class ContributedFilter(filters.BaseFilterBackend):
+    """
+    Restrict ideas to those the user contributes to with ?contributed=true.
+    
+    Reuses the per-request contributed-idea memo of the permission classes.
+    Results depend on the requesting user, so cached responses that carry
+    the parameter must be keyed per user (see ``varies_by_user``).
+    """
+    
+    param = 'contributed'
+    
+    def varies_by_user(self, request):
+        """Return True if the request's results depend on who is asking."""
+        return self.param in request.query_params
+    
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get(self.param, '').lower()
+        if value in ('true', '1'):
+            return queryset.filter(pk__in=get_contributed_idea_ids(request))
+        if value in ('false', '0'):
+            return queryset.exclude(pk__in=get_contributed_idea_ids(request))
+        return queryset
@@ -0,0 +1,182 @@
+"""
+Bulk idea import for Ideas app.
+
+Rows are streamed from CSV or NDJSON input, validated in chunks with
+IdeaCreateSerializer and written with one bulk_create for the ideas and
+one for their SUBMITTER contributors per chunk.
+"""
+
+import csv
+import json
+from collections import Counter, defaultdict
+from itertools import islice
+from django.db import IntegrityError, transaction
+
+from common.cache import bump_generations
+from .models import Idea, Campaign, CampaignStats, Contributor
+from .search import update_search_vectors
+from .serializers import IdeaCreateSerializer
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+IMPORT_CHUNK_SIZE = 500
+
+
+def read_csv_rows(lines):
+    """Yield (line number, row) pairs from CSV lines with a header row."""
+    reader = csv.DictReader(lines)
+    # Report the line a record starts on, as quoted fields may span lines
+    start = 2
+    for row in reader:
+        yield start, row
+        start = reader.line_num + 1
+
+
+def read_ndjson_rows(lines):
+    """Yield (line number, row) pairs from newline-delimited JSON, skipping blank lines."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            row = {'__error__': f'Invalid JSON: {str(e)}'}
+        if not isinstance(row, dict):
+            row = {'__error__': 'Each line must be a JSON object'}
+        yield number, row
+
+
+def read_rows(lines, import_format):
+    """Return a row iterator for the given import format."""
+    if import_format == 'csv':
+        return read_csv_rows(lines)
+    if import_format == 'ndjson':
+        return read_ndjson_rows(lines)
+    raise ValueError(f"Unsupported import format: {import_format}")
+
+
+class IdeaImporter:
+    """
+    Import ideas for one submitter from an iterator of (row number, row) pairs.
+    
+    Valid rows are created, invalid ones are reported by row number; a bad
+    row never prevents the rest of the file from being imported.
+    """
+    
+    def __init__(self, submitter, chunk_size=IMPORT_CHUNK_SIZE):
+        self.submitter = submitter
+        self.chunk_size = chunk_size
+        self.created = 0
+        self.errors = []
+        self.campaign_ids = set()
+        # (title, campaign_id) pairs already imported from this file
+        self._seen = set()
+    
+    def run(self, rows):
+        """Import every row and return the report."""
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self._import_chunk(chunk)
+        
+        if self.created:
+            scopes = ['ideas', f'user:{self.submitter.pk}']
+            scopes += [f'campaign:{campaign_id}' for campaign_id in self.campaign_ids]
+            transaction.on_commit(lambda: bump_generations(*scopes))
+        
+        return self.report()
+    
+    def report(self):
+        """Return the created count and per-row errors."""
+        return {
+            'created': self.created,
+            'failed': len(self.errors),
+            'errors': self.errors,
+        }
+    
+    def _import_chunk(self, chunk):
+        """Validate a chunk, drop duplicates and bulk create the remaining rows."""
+        valid = []
+        for number, row in chunk:
+            if '__error__' in row:
+                self._add_error(number, {'non_field_errors': [row['__error__']]})
+                continue
+            serializer = IdeaCreateSerializer(data=row)
+            if serializer.is_valid():
+                valid.append((number, serializer.validated_data))
+            else:
+                self._add_error(number, serializer.errors)
+        
+        if not valid:
+            return
+        
+        campaign_ids = {data['campaign_id'] for _, data in valid}
+        known_campaigns = set(
+            Campaign.objects.filter(id__in=campaign_ids).values_list('id', flat=True)
+        )
+        # One query for every (title, campaign) pair in the chunk, served by the
+        # unique_together index; exact pairs are matched in Python
+        existing = set(
+            Idea.objects
+            .filter(campaign_id__in=known_campaigns, title__in={data['title'] for _, data in valid})
+            .values_list('title', 'campaign_id')
+        )
+        
+        ideas = []
+        numbers = []
+        for number, data in valid:
+            key = (data['title'], data['campaign_id'])
+            if data['campaign_id'] not in known_campaigns:
+                self._add_error(number, {'campaign_id': ['Campaign not found']})
+            elif key in existing or key in self._seen:
+                self._add_error(number, {'title': ['An idea with this title already exists in the campaign']})
+            else:
+                self._seen.add(key)
+                numbers.append(number)
+                ideas.append(Idea(
+                    title=data['title'],
+                    description=data['description'],
+                    expected_impact=data['expected_impact'],
+                    campaign_id=data['campaign_id'],
+                    submitter=self.submitter,
+                    contributor_count=1
+                ))
+        
+        if ideas:
+            self._create(numbers, ideas)
+    
+    def _create(self, numbers, ideas):
+        """Insert ideas and their submitter contributors in one transaction."""
+        try:
+            with transaction.atomic():
+                Idea.objects.bulk_create(ideas)
+                Contributor.objects.bulk_create([
+                    Contributor(idea=idea, user=self.submitter, role='SUBMITTER')
+                    for idea in ideas
+                ])
+                update_search_vectors(Idea.objects.filter(pk__in=[idea.pk for idea in ideas]))
+                self._update_campaign_stats(ideas)
+        except IntegrityError:
+            # A concurrent write took one of the titles after the pre-check
+            for number in numbers:
+                self._add_error(number, {'non_field_errors': ['Conflicted with a concurrent write; retry this row']})
+            return
+        
+        self.created += len(ideas)
+        self.campaign_ids.update(idea.campaign_id for idea in ideas)
+    
+    def _update_campaign_stats(self, ideas):
+        """Apply one counter delta per campaign for the created ideas."""
+        deltas = defaultdict(Counter)
+        for idea in ideas:
+            campaign_deltas = deltas[idea.campaign_id]
+            campaign_deltas[CampaignStats.counter_field(idea.status)] += 1
+            campaign_deltas[CampaignStats.counter_field(idea.expected_impact)] += 1
+            campaign_deltas['contributor_count'] += 1
+        for campaign_id, campaign_deltas in deltas.items():
+            CampaignStats.objects.apply_deltas(campaign_id, **campaign_deltas)
+    
+    def _add_error(self, number, errors):
+        """Record the validation errors for a row."""
+        self.errors.append({'row': number, 'errors': errors})
@@ -0,0 +1,161 @@
+"""
+Redis sorted-set leaderboards for submitters and contributors.
+
+Each board is kept globally and per campaign. Scores are the points of the
+ideas a user submitted (``submitters``) or contributes to (``contributors``),
+so ranks are O(log n) ZREVRANK lookups instead of aggregations over Postgres.
+"""
+
+import logging
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import Case, IntegerField, Sum, Value, When
+
+from common.redis_client import get_redis
+from .models import Contributor, Idea
+
+logger = logging.getLogger(__name__)
+
+BOARDS = ('submitters', 'contributors')
+BOARD_KEY = 'leaderboard:{board}:{scope}'
+
+# Points an idea is worth in each status; drafts do not count
+STATUS_POINTS = {
+    'DRAFT': 0,
+    'SUBMITTED': 10,
+    'UNDER_EVALUATION': 10,
+    'EVALUATED': 10,
+    'RECOGNIZED': 60,
+}
+
+
+def board_key(board, campaign_id=None):
+    """Return the sorted-set key of a board, global or for one campaign."""
+    scope = f'campaign:{campaign_id}' if campaign_id else 'global'
+    return BOARD_KEY.format(board=board, scope=scope)
+
+
+def idea_points(status):
+    """Return the points an idea in the given status is worth."""
+    return STATUS_POINTS.get(status, 0)
+
+
+def _apply(increments):
+    """Apply (board, campaign_id, user_id, delta) increments in one pipeline."""
+    # Net the increments per key first, so a status change is one ZINCRBY
+    # per board and a campaign move leaves the global board untouched
+    totals = Counter()
+    for board, campaign_id, user_id, delta in increments:
+        totals[board_key(board), user_id] += delta
+        totals[board_key(board, campaign_id), user_id] += delta
+    totals = {item: delta for item, delta in totals.items() if delta}
+    if not totals:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for (key, user_id), delta in totals.items():
+            pipe.zincrby(key, delta, user_id)
+        pipe.execute()
+    except Exception as e:
+        # rebuild_leaderboards restores the boards from Postgres
+        logger.warning(f"Failed to update leaderboards: {str(e)}")
+
+
+def schedule_increments(increments):
+    """Apply leaderboard increments once the current transaction commits."""
+    increments = [item for item in increments if item[3]]
+    if increments:
+        transaction.on_commit(lambda: _apply(increments))
+
+
+def idea_increments(campaign_id, submitter_id, contributor_ids, points):
+    """Increments crediting an idea's points to its submitter and contributors."""
+    yield ('submitters', campaign_id, submitter_id, points)
+    for user_id in contributor_ids:
+        yield ('contributors', campaign_id, user_id, points)
+
+
+def top(board, campaign_id=None, limit=10):
+    """Return the top (user_id, score) pairs of a board."""
+    entries = get_redis().zrevrange(board_key(board, campaign_id), 0, limit - 1, withscores=True)
+    return [(int(user_id), int(score)) for user_id, score in entries]
+
+
+def rank(board, user_id, campaign_id=None):
+    """Return a user's (1-based rank, score), or None if they are not on the board."""
+    key = board_key(board, campaign_id)
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.zrevrank(key, user_id)
+    pipe.zscore(key, user_id)
+    position, score = pipe.execute()
+    if position is None:
+        return None
+    return position + 1, int(score)
+
+
+def _points_expression(lookup):
+    """SQL expression for the points of the idea status at the given lookup."""
+    return Case(
+        *[When(**{lookup: status}, then=Value(points)) for status, points in STATUS_POINTS.items()],
+        default=Value(0),
+        output_field=IntegerField()
+    )
+
+
+def compute_scores():
+    """Aggregate every board from Postgres as {(board, campaign_id or None): {user_id: score}}."""
+    rows = {
+        'submitters': (
+            Idea.objects.exclude(status='DRAFT')
+            .values_list('campaign_id', 'submitter_id')
+            .annotate(total=Sum(_points_expression('status')))
+            .order_by()
+        ),
+        'contributors': (
+            Contributor.objects.filter(role='CONTRIBUTOR').exclude(idea__status='DRAFT')
+            .values_list('idea__campaign_id', 'user_id')
+            .annotate(total=Sum(_points_expression('idea__status')))
+            .order_by()
+        ),
+    }
+    scores = defaultdict(Counter)
+    for board, queryset in rows.items():
+        # Register the global board even when it is empty, so rebuild clears it
+        scores[board, None]
+        for campaign_id, user_id, total in queryset:
+            scores[board, campaign_id][user_id] += total
+            scores[board, None][user_id] += total
+    return scores
+
+
+def rebuild():
+    """
+    Regenerate every board from Postgres and return the number of boards written.
+    
+    Boards are filled under temporary keys and swapped in with RENAME, so
+    readers never see a partially built board; boards of campaigns that no
+    longer score are removed.
+    """
+    client = get_redis()
+    scores = compute_scores()
+    stale = set(client.scan_iter(match=BOARD_KEY.format(board='*', scope='*')))
+    
+    fill = client.pipeline(transaction=False)
+    swap = client.pipeline(transaction=True)
+    for (board, campaign_id), members in scores.items():
+        key = board_key(board, campaign_id)
+        members = {user_id: score for user_id, score in members.items() if score}
+        stale.discard(key)
+        if not members:
+            swap.delete(key)
+            continue
+        temp_key = f'{key}:rebuild'
+        fill.delete(temp_key)
+        fill.zadd(temp_key, members)
+        swap.rename(temp_key, key)
+    for key in stale:
+        swap.delete(key)
+    
+    fill.execute()
+    swap.execute()
+    return len(scores)
@@ -0,0 +1,107 @@
+"""
+Management command comparing ModelSerializer and fast-path list serialization.
+"""
+
+import timeit
+import uuid
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from auth_app.cache import PROFILE_FIELDS
+from auth_app.serializers import PROFILES_CONTEXT_KEY
+from ideas.fast_serializers import ValuesRowSerializer
+from ideas.models import Campaign, Idea
+from ideas.serializers import IdeaListSerializer
+
+
+class Command(BaseCommand):
+    """Micro-benchmark IdeaListSerializer against ValuesRowSerializer."""
+    
+    help = 'Benchmark list serialization paths on in-memory rows (no database access)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='20,100,1000', help='Comma-separated row counts')
+        parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions per size')
+    
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        renderer = JSONRenderer()
+        
+        self.stdout.write(f"{'rows':>6} {'drf ms':>10} {'fast ms':>10} {'speedup':>8}")
+        for size in sizes:
+            ideas = self._build_ideas(size)
+            # Primed profiles keep CachedUserField off the cache and the database
+            context = {PROFILES_CONTEXT_KEY: self._profiles(ideas)}
+            fast = ValuesRowSerializer(IdeaListSerializer, context=context)
+            rows = [self._to_row(idea, fast.columns) for idea in ideas]
+            
+            drf_data = IdeaListSerializer(ideas, many=True, context=context).data
+            fast_data = fast.serialize(rows)
+            if any(item['submitter'] is None for item in drf_data):
+                self.stderr.write(self.style.ERROR(f'Submitter missing at {size} rows'))
+                return
+            if renderer.render(drf_data) != renderer.render(fast_data):
+                self.stderr.write(self.style.ERROR(f'Output differs at {size} rows'))
+                return
+            
+            number = max(1, 2000 // size)
+            drf_time = min(timeit.repeat(
+                lambda: renderer.render(IdeaListSerializer(ideas, many=True, context=context).data),
+                number=number, repeat=options['repeat']
+            )) / number
+            fast_time = min(timeit.repeat(
+                lambda: renderer.render(fast.serialize(rows)),
+                number=number, repeat=options['repeat']
+            )) / number
+            
+            self.stdout.write(
+                f'{size:>6} {drf_time * 1000:>10.3f} {fast_time * 1000:>10.3f} {drf_time / fast_time:>7.1f}x'
+            )
+    
+    def _build_ideas(self, size):
+        """Build unsaved ideas with a submitter, as loaded by the list queryset."""
+        campaign = Campaign(id=uuid.uuid4(), name='Benchmark')
+        now = timezone.now()
+        ideas = []
+        for i in range(size):
+            submitter = User(
+                id=i + 1,
+                username=f'user{i}',
+                email=f'user{i}@example.com',
+                first_name='Bench',
+                last_name=f'User {i}'
+            )
+            ideas.append(Idea(
+                id=uuid.uuid4(),
+                title=f'Idea {i}',
+                description='Benchmark idea',
+                expected_impact='MEDIUM',
+                status='SUBMITTED',
+                submitter=submitter,
+                campaign=campaign,
+                created_at=now,
+                contributor_count=i % 5,
+                document_count=i % 3
+            ))
+        return ideas
+    
+    @staticmethod
+    def _profiles(ideas):
+        """Build the profile dict CachedUserField reads from the in-memory submitters."""
+        return {
+            idea.submitter.id: {name: getattr(idea.submitter, name) for name in PROFILE_FIELDS}
+            for idea in ideas
+        }
+    
+    @staticmethod
+    def _to_row(idea, columns):
+        """Build the values() dict the list queryset would return for an idea."""
+        row = {}
+        for column in columns:
+            value = idea
+            for part in column.split('__'):
+                value = getattr(value, part)
+            row[column] = value
+        return row
@@ -0,0 +1,44 @@
+"""
+Management command to bulk import ideas from a CSV or NDJSON file.
+"""
+
+import json
+import os
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from ideas.importers import IdeaImporter, IMPORT_CHUNK_SIZE, IMPORT_FORMATS, read_rows
+
+
+class Command(BaseCommand):
+    """Import ideas for a submitter, streaming the input file."""
+    
+    help = 'Bulk import ideas from a CSV or NDJSON file'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import')
+        parser.add_argument('--submitter', required=True, help='Username of the submitter')
+        parser.add_argument('--format', dest='import_format', choices=IMPORT_FORMATS,
+                            help='Input format (defaults to the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+    
+    def handle(self, *args, **options):
+        try:
+            submitter = User.objects.get(username=options['submitter'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['submitter']} not found")
+        
+        import_format = options['import_format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if import_format not in IMPORT_FORMATS:
+            raise CommandError(f"Cannot infer format of {options['path']}; pass --format")
+        
+        importer = IdeaImporter(submitter, chunk_size=options['chunk_size'])
+        with open(options['path'], encoding='utf-8-sig', newline='') as lines:
+            report = importer.run(read_rows(lines, import_format))
+        
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {json.dumps(error['errors'])}")
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} ideas, {report['failed']} rows failed"
+        ))
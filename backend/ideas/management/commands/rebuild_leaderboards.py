@@ -0,0 +1,18 @@
+"""
+Management command to rebuild the Redis leaderboards from Postgres.
+"""
+
+from django.core.management.base import BaseCommand
+
+from ideas import leaderboard
+
+
+class Command(BaseCommand):
+    """Regenerate the submitter and contributor leaderboards."""
+    
+    help = 'Rebuild the submitter and contributor leaderboards from the database'
+    
+    def handle(self, *args, **options):
+        boards = leaderboard.rebuild()
+        
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {boards} leaderboards'))
@@ -0,0 +1,31 @@
+"""
+Management command to backfill Idea.search_vector.
+"""
+
+from django.core.management.base import BaseCommand
+
+from ideas.models import Idea
+from ideas.search import update_search_vectors
+
+
+class Command(BaseCommand):
+    """Recompute full-text search vectors for ideas."""
+    
+    help = 'Recompute Idea.search_vector (only missing vectors unless --all is given)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild every idea, not only missing vectors')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of ideas updated per statement')
+    
+    def handle(self, *args, **options):
+        queryset = Idea.objects.all()
+        if not options['all']:
+            queryset = queryset.filter(search_vector__isnull=True)
+        
+        batch_size = options['batch_size']
+        ids = list(queryset.order_by().values_list('id', flat=True))
+        updated = 0
+        for start in range(0, len(ids), batch_size):
+            updated += update_search_vectors(Idea.objects.filter(id__in=ids[start:start + batch_size]))
+        
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search vectors for {updated} ideas'))
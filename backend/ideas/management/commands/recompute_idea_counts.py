@@ -0,0 +1,25 @@
+"""
+Management command to recompute denormalized idea counters.
+"""
+
+from django.core.management.base import BaseCommand
+
+from ideas.models import Idea
+
+
+class Command(BaseCommand):
+    """Recompute Idea.contributor_count and Idea.document_count."""
+    
+    help = 'Recompute contributor_count and document_count from the child tables'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--campaign', help='Only recompute ideas in this campaign')
+    
+    def handle(self, *args, **options):
+        queryset = Idea.objects.all()
+        if options['campaign']:
+            queryset = queryset.filter(campaign_id=options['campaign'])
+        
+        updated = queryset.recompute_counts()
+        
+        self.stdout.write(self.style.SUCCESS(f'Recomputed counts for {updated} ideas'))
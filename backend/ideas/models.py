@@ -3,10 +3,16 @@ Domain models for Idea Submission & Management.
 """
 
 import uuid
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, TruncDate, Upper
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.contrib.postgres.search import SearchVectorField
-from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.indexes import GinIndex, OpClass
+
+# Idea statuses visible to every user; also the predicate of idea_public_recent_idx
+PUBLIC_STATUSES = ['SUBMITTED', 'UNDER_EVALUATION', 'EVALUATED', 'RECOGNIZED']
 
 class Campaign(models.Model):
     """Campaign model for organizing ideas."""
@@ -30,12 +36,58 @@ class Campaign(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['status', '-created_at']),
+            # Case-insensitive prefix lookups (name__istartswith) for autocomplete
+            models.Index(OpClass(Upper('name'), name='text_pattern_ops'), name='campaign_name_prefix_idx'),
         ]
     
     def __str__(self):
         return self.name
 
 
+class IdeaQuerySet(models.QuerySet):
+    """QuerySet for Idea with visibility and denormalized counter helpers."""
+    
+    def visible_to(self, user):
+        """
+        Ideas the user may see: all public ideas plus their own drafts.
+        
+        The two arms are disjoint and each matches a partial index, instead
+        of an OR on submitter that defeats the status indexes.
+        """
+        if user.is_staff:
+            return self
+        return self.filter(
+            models.Q(status__in=Idea.PUBLIC_STATUSES) |
+            models.Q(submitter=user, status='DRAFT')
+        )
+    
+    def adjust_counts(self, contributors=0, documents=0):
+        """Add deltas to the child counters and bump children_version in a single UPDATE."""
+        changes = {'children_version': F('children_version') + 1}
+        if contributors:
+            changes['contributor_count'] = F('contributor_count') + contributors
+        if documents:
+            changes['document_count'] = F('document_count') + documents
+        return self.update(**changes)
+    
+    def recompute_counts(self):
+        """Recompute contributor_count/document_count from the child tables."""
+        # Resolve through the reverse relations so the counts follow the
+        # models that actually back Idea.contributors and Idea.documents
+        changes = {}
+        for field, relation in (('contributor_count', 'contributors'), ('document_count', 'documents')):
+            child_model = getattr(self.model, relation).rel.related_model
+            counts = (
+                child_model.objects.filter(idea=OuterRef('pk'))
+                .order_by()
+                .values('idea')
+                .annotate(total=Count('pk'))
+                .values('total')
+            )
+            changes[field] = Coalesce(Subquery(counts), 0)
+        return self.update(**changes)
+
+
 class Idea(models.Model):
     """Idea model for submitted ideas."""
     
@@ -53,6 +105,9 @@ class Idea(models.Model):
         ('LOW', 'Low'),
     ]
     
+    # Statuses visible to every user
+    PUBLIC_STATUSES = PUBLIC_STATUSES
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -65,22 +120,74 @@ class Idea(models.Model):
     submitted_at = models.DateTimeField(null=True, blank=True)
     recognized_at = models.DateTimeField(null=True, blank=True)
     
+    # Denormalized child counts, maintained by signal handlers
+    contributor_count = models.IntegerField(default=0)
+    document_count = models.IntegerField(default=0)
+    
+    # Bumped on every contributor/document write, used for detail ETags
+    children_version = models.IntegerField(default=0)
+    
     # Search vector for full-text search
     search_vector = SearchVectorField(null=True, blank=True)
     
+    objects = IdeaQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['submitter', 'status']),
             models.Index(fields=['campaign', 'status']),
-            models.Index(fields=['-created_at']),
+            models.Index(fields=['-created_at', '-id']),
             models.Index(fields=['status']),
             GinIndex(fields=['search_vector']),
+            # Partial indexes backing the two arms of IdeaQuerySet.visible_to
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='idea_public_recent_idx',
+                condition=models.Q(status__in=PUBLIC_STATUSES)
+            ),
+            models.Index(
+                fields=['submitter', '-created_at'],
+                name='idea_draft_submitter_idx',
+                condition=models.Q(status='DRAFT')
+            ),
+            # Watermark scans of ideas changed since the last rollup refresh
+            models.Index(fields=['updated_at']),
+            # Trigram index for near-duplicate title detection
+            GinIndex(fields=['title'], name='idea_title_trgm_idx', opclasses=['gin_trgm_ops']),
+            # Case-insensitive prefix lookups (title__istartswith) for autocomplete
+            models.Index(OpClass(Upper('title'), name='text_pattern_ops'), name='idea_title_prefix_idx'),
         ]
         unique_together = [['title', 'campaign']]
     
     def __str__(self):
         return self.title
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember loaded values so saves can tell which fields changed."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """Save and reset the loaded values once post_save handlers have run."""
+        super().save(*args, **kwargs)
+        self._loaded_values = {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+    
+    def field_changed(self, *field_names):
+        """Return True if any of the given fields differ from the loaded values."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return True
+        return any(
+            name not in loaded or loaded[name] != getattr(self, name)
+            for name in field_names
+        )
 
 
 class Contributor(models.Model):
@@ -138,3 +245,194 @@ class Document(models.Model):
     
     def __str__(self):
         return self.file_name
+
+
+class CampaignStatsQuerySet(models.QuerySet):
+    """QuerySet for CampaignStats with incremental and full recompute helpers."""
+    
+    def apply_deltas(self, campaign_id, seed=True, **deltas):
+        """
+        Add deltas to a campaign's counters in a single UPDATE.
+        
+        A missing row is seeded from the source tables, which already include
+        the write that produced the deltas. Deletes pass seed=False, so a
+        cascading campaign delete never recreates the row it just removed.
+        """
+        changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        if not changes:
+            return
+        if not self.filter(campaign_id=campaign_id).update(**changes) and seed:
+            self.recompute([campaign_id])
+    
+    def recompute(self, campaign_ids):
+        """
+        Rebuild the counters of the given campaigns from the source tables.
+        
+        Existing rows are locked first, so concurrent deltas either land in
+        the counts read here or are applied on top of the rewritten row.
+        Returns the number of campaigns whose counters were corrected.
+        """
+        campaign_ids = list(campaign_ids)
+        with transaction.atomic():
+            existing = {
+                stats.campaign_id: stats
+                for stats in self.select_for_update().filter(campaign_id__in=campaign_ids).order_by('campaign_id')
+            }
+            fresh = {
+                campaign_id: CampaignStats(campaign_id=campaign_id)
+                for campaign_id in Campaign.objects.filter(id__in=campaign_ids).values_list('id', flat=True)
+            }
+            
+            aggregates = {}
+            for lookup, choices in (('status', Idea.STATUS_CHOICES), ('expected_impact', Idea.IMPACT_CHOICES)):
+                for value, _ in choices:
+                    aggregates[CampaignStats.counter_field(value)] = Count('pk', filter=Q(**{lookup: value}))
+            rows = Idea.objects.filter(campaign_id__in=list(fresh)).values('campaign_id').annotate(**aggregates).order_by()
+            for row in rows:
+                stats = fresh[row.pop('campaign_id')]
+                for field, value in row.items():
+                    setattr(stats, field, value)
+            
+            # Resolve through the reverse relations, as in IdeaQuerySet.recompute_counts
+            for field, relation in (('contributor_count', 'contributors'), ('document_count', 'documents')):
+                child_model = getattr(Idea, relation).rel.related_model
+                totals = (
+                    child_model.objects.filter(idea__campaign_id__in=list(fresh))
+                    .values_list('idea__campaign_id')
+                    .annotate(total=Count('pk'))
+                    .order_by()
+                )
+                for campaign_id, total in totals:
+                    setattr(fresh[campaign_id], field, total)
+            
+            fields = CampaignStats.COUNTER_FIELDS
+            changed = [
+                stats for campaign_id, stats in fresh.items()
+                if campaign_id in existing and any(
+                    getattr(stats, field) != getattr(existing[campaign_id], field) for field in fields
+                )
+            ]
+            # bulk_update skips auto_now, so stamp updated_at explicitly
+            now = timezone.now()
+            for stats in changed:
+                stats.updated_at = now
+            self.bulk_update(changed, fields + ['updated_at'])
+            self.bulk_create(
+                [stats for campaign_id, stats in fresh.items() if campaign_id not in existing],
+                ignore_conflicts=True
+            )
+        return len(changed)
+
+
+class CampaignStats(models.Model):
+    """Per-campaign idea, contributor and document counters, maintained incrementally."""
+    
+    campaign = models.OneToOneField(Campaign, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    
+    # Ideas by status
+    draft_count = models.IntegerField(default=0)
+    submitted_count = models.IntegerField(default=0)
+    under_evaluation_count = models.IntegerField(default=0)
+    evaluated_count = models.IntegerField(default=0)
+    recognized_count = models.IntegerField(default=0)
+    
+    # Ideas by expected impact
+    high_count = models.IntegerField(default=0)
+    medium_count = models.IntegerField(default=0)
+    low_count = models.IntegerField(default=0)
+    
+    # Contributor and document rows across all ideas in the campaign
+    contributor_count = models.IntegerField(default=0)
+    document_count = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = CampaignStatsQuerySet.as_manager()
+    
+    COUNTER_FIELDS = [
+        'draft_count', 'submitted_count', 'under_evaluation_count', 'evaluated_count', 'recognized_count',
+        'high_count', 'medium_count', 'low_count',
+        'contributor_count', 'document_count',
+    ]
+    
+    class Meta:
+        verbose_name_plural = 'campaign stats'
+    
+    def __str__(self):
+        return f"Stats for {self.campaign_id}"
+    
+    @staticmethod
+    def counter_field(value):
+        """Return the counter field for an Idea status or expected_impact value."""
+        return f'{value.lower()}_count'
+    
+    @property
+    def idea_count(self):
+        """Total ideas in the campaign."""
+        return sum(getattr(self, self.counter_field(value)) for value, _ in Idea.STATUS_CHOICES)
+
+
+class SubmissionRollupQuerySet(models.QuerySet):
+    """QuerySet for SubmissionRollup with bucket recompute helpers."""
+    
+    def recompute(self, buckets):
+        """Rewrite the given (campaign_id, day) buckets from the submitted ideas in them."""
+        days_by_campaign = {}
+        for campaign_id, day in buckets:
+            days_by_campaign.setdefault(campaign_id, set()).add(day)
+        if not days_by_campaign:
+            return 0
+        
+        in_buckets = Q()
+        for campaign_id, days in days_by_campaign.items():
+            in_buckets |= Q(campaign_id=campaign_id, day__in=days)
+        
+        counts = (
+            Idea.objects.filter(submitted_at__isnull=False)
+            .annotate(day=TruncDate('submitted_at'))
+            .filter(in_buckets)
+            .values_list('campaign_id', 'day', 'status')
+            .annotate(total=Count('pk'))
+            .order_by()
+        )
+        rows = [
+            SubmissionRollup(campaign_id=campaign_id, day=day, status=status, count=total)
+            for campaign_id, day, status, total in counts
+        ]
+        with transaction.atomic():
+            self.filter(in_buckets).delete()
+            self.bulk_create(rows)
+        return len(rows)
+    
+    def adjust(self, campaign_id, submitted_at, status, delta):
+        """Add a delta to the bucket of one submitted idea."""
+        day = timezone.localtime(submitted_at).date()
+        return self.filter(campaign_id=campaign_id, day=day, status=status).update(count=F('count') + delta)
+
+
+class SubmissionRollup(models.Model):
+    """Submitted ideas per campaign, submission day and current status."""
+    
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='submission_rollups')
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Idea.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    
+    objects = SubmissionRollupQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['day']
+        unique_together = [['campaign', 'day', 'status']]
+    
+    def __str__(self):
+        return f"{self.campaign_id} {self.day} {self.status}: {self.count}"
+
+
+class RollupWatermark(models.Model):
+    """High-water mark of the last incremental rollup refresh, by rollup name."""
+    
+    name = models.CharField(max_length=50, primary_key=True)
+    processed_until = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.name}: {self.processed_until}"
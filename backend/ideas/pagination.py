@@ -0,0 +1,46 @@
+"""
+Pagination classes for Ideas app.
+"""
+
+from rest_framework.pagination import CursorPagination
+from rest_framework.settings import api_settings
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination that always keys on its own ordering.
+    
+    Used for sub-resources served from IdeaViewSet actions, whose
+    OrderingFilter would otherwise impose the idea ordering.
+    """
+    
+    def get_ordering(self, request, queryset, view):
+        return self.ordering
+
+
+class IdeaCursorPagination(CursorPagination):
+    """
+    Keyset pagination for idea listings on (-created_at, -id).
+    
+    Avoids the COUNT(*) and deep OFFSET of page number pagination. Ranked
+    full-text searches are keyed on search_rank instead.
+    """
+    
+    ordering = ('-created_at', '-id')
+    
+    def get_ordering(self, request, queryset, view):
+        if 'search_rank' in queryset.query.annotations and not request.query_params.get(api_settings.ORDERING_PARAM):
+            return ('-search_rank', '-created_at', '-id')
+        return super().get_ordering(request, queryset, view)
+
+
+class ContributorCursorPagination(KeysetPagination):
+    """Keyset pagination for an idea's contributors."""
+    
+    ordering = ('added_at', 'id')
+
+
+class DocumentCursorPagination(KeysetPagination):
+    """Keyset pagination for an idea's documents."""
+    
+    ordering = ('-uploaded_at', '-id')
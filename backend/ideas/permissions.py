@@ -4,6 +4,31 @@ Permissions for Ideas app.
 
 from rest_framework import permissions
 
+from .models import Contributor
+
+
+def get_contributed_idea_ids(request):
+    """
+    Return the IDs of ideas the requesting user contributes to.
+    
+    Loaded with one query and memoized on the request, so object permission
+    checks and list filters share it.
+    """
+    idea_ids = getattr(request, '_contributed_idea_ids', None)
+    if idea_ids is None:
+        idea_ids = frozenset(
+            Contributor.objects.filter(user_id=request.user.pk).values_list('idea_id', flat=True)
+        )
+        request._contributed_idea_ids = idea_ids
+    return idea_ids
+
+
+def _idea_fields(obj):
+    """Return (idea_id, submitter_id) for an idea or an object that belongs to one."""
+    if hasattr(obj, 'submitter_id'):
+        return obj.pk, obj.submitter_id
+    return obj.idea_id, obj.idea.submitter_id
+
 
 class IsSubmitterOrReadOnly(permissions.BasePermission):
     """
@@ -15,8 +40,9 @@ class IsSubmitterOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         
-        # Write permissions are only allowed to the submitter
-        return obj.submitter == request.user
+        # Write permissions are only allowed to the submitter; compare IDs so
+        # the submitter row is never loaded
+        return _idea_fields(obj)[1] == request.user.pk
 
 
 class IsContributor(permissions.BasePermission):
@@ -25,7 +51,7 @@ class IsContributor(permissions.BasePermission):
     """
     
     def has_object_permission(self, request, view, obj):
-        return obj.contributors.filter(user=request.user).exists()
+        return _idea_fields(obj)[0] in get_contributed_idea_ids(request)
 
 
 class IsPanelMember(permissions.BasePermission):
@@ -0,0 +1,42 @@
+"""
+Full-text search helpers for Ideas app.
+"""
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector, TrigramSimilarity
+
+# Text search configuration used for both indexing and querying
+SEARCH_CONFIG = 'english'
+
+
+def idea_search_vector():
+    """Build the weighted search vector expression (title A, description B)."""
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+        SearchVector('description', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(queryset):
+    """Recompute search_vector in the database for the given ideas."""
+    return queryset.update(search_vector=idea_search_vector())
+
+
+def find_similar_ideas(queryset, campaign_id, title, exclude_pk=None):
+    """
+    Return the ideas in a campaign whose titles are most similar to the given one.
+    
+    The trigram_similar filter (pg_trgm's % operator) is served by the GIN
+    trigram index on title; the stricter threshold and top-k cut are then
+    applied to the few candidates it returns.
+    """
+    candidates = queryset.filter(campaign_id=campaign_id, title__trigram_similar=title)
+    if exclude_pk is not None:
+        candidates = candidates.exclude(pk=exclude_pk)
+    return list(
+        candidates
+        .annotate(similarity=TrigramSimilarity('title', title))
+        .filter(similarity__gte=settings.IDEA_SIMILARITY_THRESHOLD)
+        .order_by('-similarity')
+        .values('id', 'title', 'status', 'similarity')[:settings.IDEA_SIMILAR_LIMIT]
+    )
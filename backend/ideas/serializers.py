@@ -4,7 +4,56 @@ Serializers for Ideas app.
 
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Idea, Campaign, Contributor, Document
+from django.db import IntegrityError, transaction
+from auth_app.serializers import CachedUserField, CachedUserListSerializer
+from common.exceptions import ConflictError
+from .models import Idea, Campaign, CampaignStats, Contributor, Document
+from .search import find_similar_ideas
+
+
+def _split_param(value):
+    """Split a comma-separated query param into a set of names."""
+    if not value:
+        return set()
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Trim the representation with ?fields= and ?expand= query params.
+    
+    ``fields`` selects top-level fields and ``expand`` selects which nested
+    relations (``expandable_fields``) are embedded. Naming a relation in
+    ``fields`` embeds it too. Without either param the full representation
+    is returned.
+    """
+    
+    expandable_fields = ()
+    
+    @classmethod
+    def get_sparse_fields(cls, request):
+        """Return the field names requested, or None for the full representation."""
+        if request is None:
+            return None
+        
+        fields = _split_param(request.query_params.get('fields'))
+        expand = _split_param(request.query_params.get('expand'))
+        if not fields and not expand:
+            return None
+        
+        if fields:
+            selected = fields | expand
+        else:
+            selected = {name for name in cls.Meta.fields if name not in cls.expandable_fields} | expand
+        return {name for name in cls.Meta.fields if name in selected}
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.get_sparse_fields(self.context.get('request'))
+        if selected is not None:
+            for name in list(self.fields):
+                if name not in selected:
+                    self.fields.pop(name)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -25,18 +74,59 @@ class CampaignSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+class CampaignStatsSerializer(serializers.ModelSerializer):
+    """Serializer for the per-campaign statistics rollup."""
+    
+    idea_count = serializers.IntegerField(read_only=True)
+    by_status = serializers.SerializerMethodField()
+    by_impact = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = CampaignStats
+        fields = ['campaign', 'idea_count', 'by_status', 'by_impact', 'contributor_count', 'document_count', 'updated_at']
+        read_only_fields = fields
+    
+    def get_by_status(self, obj):
+        """Idea counts keyed by status."""
+        return {value: getattr(obj, obj.counter_field(value)) for value, _ in Idea.STATUS_CHOICES}
+    
+    def get_by_impact(self, obj):
+        """Idea counts keyed by expected impact."""
+        return {value: getattr(obj, obj.counter_field(value)) for value, _ in Idea.IMPACT_CHOICES}
+
+
 class ContributorSerializer(serializers.ModelSerializer):
     """Serializer for Contributor model."""
     
-    user = UserSerializer(read_only=True)
+    user = CachedUserField(UserSerializer, source='user_id')
     user_id = serializers.IntegerField(write_only=True)
     
     class Meta:
         model = Contributor
+        list_serializer_class = CachedUserListSerializer
         fields = ['id', 'user', 'user_id', 'role', 'added_at']
         read_only_fields = ['id', 'added_at']
 
 
+class ContributorBatchSerializer(serializers.Serializer):
+    """Serializer for adding several contributors by user ID or email."""
+    
+    MAX_BATCH_SIZE = 50
+    
+    user_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    emails = serializers.ListField(child=serializers.EmailField(), required=False, default=list)
+    
+    def validate(self, attrs):
+        """Require at least one user and cap the batch size."""
+        total = len(attrs['user_ids']) + len(attrs['emails'])
+        if not total:
+            raise serializers.ValidationError("Provide user_ids or emails")
+        if total > self.MAX_BATCH_SIZE:
+            raise serializers.ValidationError(f"At most {self.MAX_BATCH_SIZE} users can be added at once")
+        attrs['emails'] = list(dict.fromkeys(email.lower() for email in attrs['emails']))
+        return attrs
+
+
 class DocumentSerializer(serializers.ModelSerializer):
     """Serializer for Document model."""
     
@@ -46,32 +136,27 @@ class DocumentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'file_path', 'uploaded_at', 'virus_scan_status']
 
 
-class IdeaListSerializer(serializers.ModelSerializer):
+class IdeaListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Idea list view."""
     
-    submitter = UserSerializer(read_only=True)
-    contributor_count = serializers.SerializerMethodField()
-    document_count = serializers.SerializerMethodField()
+    submitter = CachedUserField(UserSerializer, source='submitter_id')
+    expandable_fields = ('submitter',)
     
     class Meta:
         model = Idea
+        list_serializer_class = CachedUserListSerializer
         fields = ['id', 'title', 'expected_impact', 'submitter', 'status', 'created_at', 'contributor_count', 'document_count']
-        read_only_fields = ['id', 'created_at']
-    
-    def get_contributor_count(self, obj):
-        return obj.contributors.count()
-    
-    def get_document_count(self, obj):
-        return obj.documents.count()
+        read_only_fields = ['id', 'created_at', 'contributor_count', 'document_count']
 
 
-class IdeaDetailSerializer(serializers.ModelSerializer):
+class IdeaDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Idea detail view."""
     
-    submitter = UserSerializer(read_only=True)
+    submitter = CachedUserField(UserSerializer, source='submitter_id')
     contributors = ContributorSerializer(many=True, read_only=True)
     documents = DocumentSerializer(many=True, read_only=True)
     campaign = CampaignSerializer(read_only=True)
+    expandable_fields = ('submitter', 'campaign', 'contributors', 'documents')
     
     class Meta:
         model = Idea
@@ -83,14 +168,23 @@ class IdeaDetailSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at', 'submitted_at', 'recognized_at']
 
 
+def similar_ideas_data(similar):
+    """Represent find_similar_ideas() rows for API responses."""
+    return [
+        {'id': str(row['id']), 'title': row['title'], 'status': row['status'], 'similarity': round(row['similarity'], 3)}
+        for row in similar
+    ]
+
+
 class IdeaCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating/updating ideas."""
     
     campaign_id = serializers.UUIDField(write_only=True)
+    ignore_similar = serializers.BooleanField(write_only=True, required=False, default=False)
     
     class Meta:
         model = Idea
-        fields = ['title', 'description', 'expected_impact', 'campaign_id']
+        fields = ['title', 'description', 'expected_impact', 'campaign_id', 'ignore_similar']
     
     def validate_title(self, value):
         """Validate title length and content."""
@@ -110,24 +204,50 @@ class IdeaCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Invalid impact level")
         return value
     
+    def validate(self, attrs):
+        """Reject near-duplicates of visible ideas in the campaign unless ignore_similar is set."""
+        request = self.context.get('request')
+        if request is None or attrs.get('ignore_similar'):
+            return attrs
+        
+        similar = find_similar_ideas(
+            Idea.objects.visible_to(request.user),
+            attrs['campaign_id'],
+            attrs['title']
+        )
+        if similar:
+            raise serializers.ValidationError({
+                'similar_ideas': similar_ideas_data(similar),
+                'non_field_errors': ['Similar ideas already exist in this campaign; set ignore_similar to submit anyway'],
+            })
+        return attrs
+    
     def create(self, validated_data):
         """Create idea with submitter as first contributor."""
         campaign_id = validated_data.pop('campaign_id')
+        validated_data.pop('ignore_similar', None)
         request = self.context.get('request')
+        # perform_create passes the submitter through save()
+        submitter = validated_data.pop('submitter', request.user)
         
-        # Create idea
-        idea = Idea.objects.create(
-            submitter=request.user,
-            campaign_id=campaign_id,
-            **validated_data
-        )
-        
-        # Add submitter as contributor
-        Contributor.objects.create(
-            idea=idea,
-            user=request.user,
-            role='SUBMITTER'
-        )
+        try:
+            with transaction.atomic():
+                # Create idea
+                idea = Idea.objects.create(
+                    submitter=submitter,
+                    campaign_id=campaign_id,
+                    **validated_data
+                )
+                
+                # Add submitter as contributor
+                Contributor.objects.create(
+                    idea=idea,
+                    user=submitter,
+                    role='SUBMITTER'
+                )
+        except IntegrityError:
+            # (title, campaign) is unique; a retried create lands here
+            raise ConflictError('An idea with this title already exists in the campaign.')
         
         return idea
 
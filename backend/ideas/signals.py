@@ -0,0 +1,211 @@
+"""
+Signal handlers for Ideas app.
+"""
+
+from collections import Counter
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from common.cache import bump_generations
+from .models import Idea, Campaign, Contributor, Document, CampaignStats, SubmissionRollup
+from . import leaderboard
+from .search import update_search_vectors
+
+
+def invalidate_idea_caches(idea_id, campaign_id, submitter_id, *extra_scopes):
+    """Bump the cache generations an idea write affects, once the transaction commits."""
+    scopes = ['ideas', f'campaign:{campaign_id}', f'user:{submitter_id}', f'idea:{idea_id}', *extra_scopes]
+    transaction.on_commit(lambda: bump_generations(*scopes))
+
+
+def parent_idea_changed(idea_id, contributors=0, documents=0, seed=True):
+    """Apply a contributor/document write to its idea, campaign stats and caches; return the idea row."""
+    Idea.objects.filter(pk=idea_id).adjust_counts(contributors=contributors, documents=documents)
+    idea = Idea.objects.filter(pk=idea_id).values('campaign_id', 'submitter_id', 'status').first()
+    if idea:
+        CampaignStats.objects.apply_deltas(
+            idea['campaign_id'],
+            seed=seed,
+            contributor_count=contributors,
+            document_count=documents
+        )
+        invalidate_idea_caches(idea_id, idea['campaign_id'], idea['submitter_id'])
+    return idea
+
+
+@receiver(post_save, sender=Idea)
+def update_idea_search_vector(sender, instance, created, **kwargs):
+    """Keep search_vector in sync when title or description change."""
+    if created or instance.field_changed('title', 'description'):
+        update_search_vectors(Idea.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Idea)
+@receiver(post_delete, sender=Idea)
+def idea_changed(sender, instance, **kwargs):
+    """Invalidate cached idea lists and details, including the lists of a campaign the idea left."""
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    old_campaign_id = loaded.get('campaign_id', instance.campaign_id)
+    extra_scopes = [f'campaign:{old_campaign_id}'] if old_campaign_id != instance.campaign_id else []
+    invalidate_idea_caches(instance.pk, instance.campaign_id, instance.submitter_id, *extra_scopes)
+
+
+@receiver(post_save, sender=Campaign)
+@receiver(post_delete, sender=Campaign)
+def campaign_changed(sender, instance, **kwargs):
+    """Invalidate cached idea lists and details that embed the campaign."""
+    scope = f'campaign:{instance.pk}'
+    transaction.on_commit(lambda: bump_generations(scope))
+
+
+@receiver(post_save, sender=User)
+def user_profile_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Invalidate cached idea payloads that embed the user's profile."""
+    # New users are not embedded anywhere yet, and logins only touch last_login
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    
+    # Every submitter also has a SUBMITTER contributor row
+    idea_ids = set(Contributor.objects.filter(user_id=instance.pk).values_list('idea_id', flat=True))
+    if not idea_ids:
+        return
+    ideas = Idea.objects.filter(pk__in=idea_ids)
+    campaign_ids = set(ideas.values_list('campaign_id', flat=True))
+    # Embedded profiles are part of the children version the detail ETag carries
+    ideas.adjust_counts()
+    
+    scopes = ['ideas', f'user:{instance.pk}']
+    scopes += [f'campaign:{campaign_id}' for campaign_id in campaign_ids]
+    scopes += [f'idea:{idea_id}' for idea_id in idea_ids]
+    transaction.on_commit(lambda: bump_generations(*scopes))
+
+
+@receiver(post_save, sender=Idea)
+def update_campaign_stats(sender, instance, created, **kwargs):
+    """Move the idea between status and impact counters of its campaign."""
+    if created:
+        CampaignStats.objects.apply_deltas(
+            instance.campaign_id,
+            **{CampaignStats.counter_field(instance.status): 1, CampaignStats.counter_field(instance.expected_impact): 1}
+        )
+        return
+    
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    tracked = ('campaign_id', 'status', 'expected_impact')
+    if any(name not in loaded for name in tracked) or loaded['campaign_id'] != instance.campaign_id:
+        # Previous values unknown, or the idea moved campaign with its children
+        CampaignStats.objects.recompute({loaded.get('campaign_id', instance.campaign_id), instance.campaign_id})
+        return
+    
+    deltas = Counter()
+    for name in ('status', 'expected_impact'):
+        if loaded[name] != getattr(instance, name):
+            deltas[CampaignStats.counter_field(loaded[name])] -= 1
+            deltas[CampaignStats.counter_field(getattr(instance, name))] += 1
+    CampaignStats.objects.apply_deltas(instance.campaign_id, **deltas)
+
+
+@receiver(post_delete, sender=Idea)
+def remove_from_campaign_stats(sender, instance, **kwargs):
+    """Remove a deleted idea from its campaign's status and impact counters."""
+    CampaignStats.objects.apply_deltas(
+        instance.campaign_id,
+        seed=False,
+        **{CampaignStats.counter_field(instance.status): -1, CampaignStats.counter_field(instance.expected_impact): -1}
+    )
+
+
+@receiver(post_save, sender=Idea)
+def update_leaderboards(sender, instance, created, **kwargs):
+    """Move the idea's points on the leaderboards when its status or campaign changes."""
+    new = (instance.campaign_id, leaderboard.idea_points(instance.status))
+    if created:
+        old = (instance.campaign_id, 0)
+    else:
+        loaded = getattr(instance, '_loaded_values', None) or {}
+        if 'status' not in loaded or 'campaign_id' not in loaded:
+            # Previous state unknown; rebuild_leaderboards corrects the boards
+            return
+        old = (loaded['campaign_id'], leaderboard.idea_points(loaded['status']))
+    if old == new:
+        return
+    
+    contributor_ids = [] if created else list(
+        instance.contributors.filter(role='CONTRIBUTOR').values_list('user_id', flat=True)
+    )
+    increments = list(leaderboard.idea_increments(old[0], instance.submitter_id, contributor_ids, -old[1]))
+    increments += leaderboard.idea_increments(new[0], instance.submitter_id, contributor_ids, new[1])
+    leaderboard.schedule_increments(increments)
+
+
+@receiver(post_delete, sender=Idea)
+def remove_from_leaderboards(sender, instance, **kwargs):
+    """Take a deleted idea's points back from its submitter; contributors are handled per row."""
+    points = leaderboard.idea_points(instance.status)
+    leaderboard.schedule_increments(
+        leaderboard.idea_increments(instance.campaign_id, instance.submitter_id, [], -points)
+    )
+
+
+@receiver(post_save, sender=Idea)
+def release_moved_submission(sender, instance, created, **kwargs):
+    """Take an idea that moved campaign out of its old submission bucket."""
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    if created or not loaded.get('submitted_at') or loaded.get('campaign_id', instance.campaign_id) == instance.campaign_id:
+        return
+    # The new bucket is picked up by refresh_submission_rollups through updated_at
+    SubmissionRollup.objects.adjust(
+        loaded['campaign_id'], loaded['submitted_at'], loaded.get('status', instance.status), -1
+    )
+
+
+@receiver(post_delete, sender=Idea)
+def remove_from_submission_rollups(sender, instance, **kwargs):
+    """Take a deleted submitted idea out of its submission bucket."""
+    if instance.submitted_at:
+        SubmissionRollup.objects.adjust(instance.campaign_id, instance.submitted_at, instance.status, -1)
+
+
+def contributors_added(idea_id, contributors):
+    """Apply newly inserted contributors to the idea, campaign stats, leaderboards and caches."""
+    idea = parent_idea_changed(idea_id, contributors=len(contributors))
+    if idea:
+        points = leaderboard.idea_points(idea['status'])
+        leaderboard.schedule_increments(
+            ('contributors', idea['campaign_id'], contributor.user_id, points)
+            for contributor in contributors
+            if contributor.role == 'CONTRIBUTOR'
+        )
+
+
+@receiver(post_save, sender=Contributor)
+def contributor_saved(sender, instance, created, **kwargs):
+    """Count new contributors on the idea, campaign and leaderboards, and invalidate caches."""
+    if created:
+        contributors_added(instance.idea_id, [instance])
+    else:
+        parent_idea_changed(instance.idea_id)
+
+
+@receiver(post_delete, sender=Contributor)
+def contributor_deleted(sender, instance, **kwargs):
+    """Uncount the contributor on the idea, campaign and leaderboards, and invalidate caches."""
+    idea = parent_idea_changed(instance.idea_id, contributors=-1, seed=False)
+    if idea and instance.role == 'CONTRIBUTOR':
+        leaderboard.schedule_increments([
+            ('contributors', idea['campaign_id'], instance.user_id, -leaderboard.idea_points(idea['status']))
+        ])
+
+
+@receiver(post_save, sender=Document)
+def document_saved(sender, instance, created, **kwargs):
+    """Count new documents on the idea and campaign, and invalidate caches."""
+    parent_idea_changed(instance.idea_id, documents=1 if created else 0)
+
+
+@receiver(post_delete, sender=Document)
+def document_deleted(sender, instance, **kwargs):
+    """Uncount the document on the idea and campaign, and invalidate caches."""
+    parent_idea_changed(instance.idea_id, documents=-1, seed=False)
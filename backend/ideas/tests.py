@@ -4,9 +4,10 @@ Tests for Ideas app.
 
 import pytest
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import Idea, Campaign, Contributor, Document
+from .models import Idea, Campaign, CampaignStats, Contributor, Document, SubmissionRollup
 from datetime import datetime, timedelta
 
 
@@ -16,6 +17,16 @@ def api_client():
     return APIClient()
 
 
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    """Use an isolated in-memory cache instead of Redis."""
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    }
+    cache.clear()
+    return cache
+
+
 @pytest.fixture
 def user(db):
     """Create test user."""
@@ -164,7 +175,7 @@ class TestIdeaViewSet:
         response = api_client.get(f'/api/v1/ideas/{idea.id}/contributors/')
         
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) > 0
+        assert len(response.data['results']) > 0
     
     def test_my_ideas(self, api_client, user, idea):
         """Test getting user's ideas."""
@@ -173,6 +184,7 @@ class TestIdeaViewSet:
         response = api_client.get('/api/v1/ideas/my/')
         
         assert response.status_code == status.HTTP_200_OK
+        assert [item['id'] for item in response.data['results']] == [str(idea.id)]
     
     def test_filter_by_status(self, api_client, user, idea):
         """Test filtering ideas by status."""
@@ -256,3 +268,988 @@ class TestDocumentViewSet:
         response = api_client.get('/api/v1/documents/')
         
         assert response.status_code == status.HTTP_200_OK
+
+
+class TestFullTextSearch:
+    """Tests for ranked full-text search on ideas."""
+    
+    def test_search_vector_populated_on_create(self, idea):
+        """Test search_vector is filled when an idea is created."""
+        idea.refresh_from_db()
+        
+        assert idea.search_vector is not None
+    
+    def test_search_vector_updated_on_title_change(self, idea):
+        """Test search_vector follows title edits."""
+        idea.title = 'Quantum teleportation'
+        idea.save()
+        
+        assert Idea.objects.filter(pk=idea.pk, search_vector='teleportation').exists()
+    
+    def test_search_ranks_title_matches_first(self, api_client, user, campaign):
+        """Test title matches outrank description matches."""
+        api_client.force_authenticate(user=user)
+        
+        in_description = Idea.objects.create(
+            title='Process improvement',
+            description='Use blockchain to track approvals',
+            expected_impact='LOW',
+            submitter=user,
+            campaign=campaign
+        )
+        in_title = Idea.objects.create(
+            title='Blockchain supply chain',
+            description='Track shipments end to end',
+            expected_impact='HIGH',
+            submitter=user,
+            campaign=campaign
+        )
+        
+        response = api_client.get('/api/v1/ideas/?search=blockchain')
+        
+        assert response.status_code == status.HTTP_200_OK
+        ids = [item['id'] for item in response.data['results']]
+        assert ids == [str(in_title.id), str(in_description.id)]
+
+
+class TestCursorPagination:
+    """Tests for keyset pagination of idea listings."""
+    
+    def test_list_uses_cursor_without_count(self, api_client, user, campaign):
+        """Test list pages follow cursors and skip the count query."""
+        api_client.force_authenticate(user=user)
+        
+        for i in range(25):
+            Idea.objects.create(
+                title=f'Idea {i}',
+                description='Paginated idea',
+                expected_impact='LOW',
+                submitter=user,
+                campaign=campaign
+            )
+        
+        first = api_client.get('/api/v1/ideas/')
+        
+        assert first.status_code == status.HTTP_200_OK
+        assert 'count' not in first.data
+        assert len(first.data['results']) == 20
+        
+        second = api_client.get(first.data['next'])
+        
+        first_ids = {item['id'] for item in first.data['results']}
+        second_ids = {item['id'] for item in second.data['results']}
+        assert len(second_ids) == 5
+        assert not first_ids & second_ids
+
+
+class TestDenormalizedCounts:
+    """Tests for Idea.contributor_count and Idea.document_count."""
+    
+    def test_contributor_count_follows_inserts_and_deletes(self, idea, db):
+        """Test contributor_count tracks contributor rows."""
+        other_user = User.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='pass123'
+        )
+        
+        contributor = Contributor.objects.create(idea=idea, user=other_user, role='CONTRIBUTOR')
+        idea.refresh_from_db()
+        assert idea.contributor_count == 2
+        
+        contributor.delete()
+        idea.refresh_from_db()
+        assert idea.contributor_count == 1
+    
+    def test_list_serializes_counts_without_child_queries(self, api_client, user, idea, django_assert_max_num_queries):
+        """Test list rows read counts from the idea row."""
+        api_client.force_authenticate(user=user)
+        
+        with django_assert_max_num_queries(2):
+            response = api_client.get('/api/v1/ideas/')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'][0]['contributor_count'] == 1
+        assert response.data['results'][0]['document_count'] == 0
+    
+    def test_recompute_command_fixes_drift(self, idea):
+        """Test recompute_idea_counts restores the real counts."""
+        from django.core.management import call_command
+        
+        Idea.objects.filter(pk=idea.pk).update(contributor_count=7, document_count=3)
+        
+        call_command('recompute_idea_counts')
+        
+        idea.refresh_from_db()
+        assert idea.contributor_count == 1
+        assert idea.document_count == 0
+
+
+class TestIdeaResponseCache:
+    """Tests for the shared idea response cache."""
+    
+    def test_list_served_from_cache(self, api_client, user, idea, django_assert_num_queries):
+        """Test a repeated list request does not touch the database."""
+        api_client.force_authenticate(user=user)
+        
+        first = api_client.get('/api/v1/ideas/')
+        with django_assert_num_queries(0):
+            second = api_client.get('/api/v1/ideas/')
+        
+        assert second.status_code == status.HTTP_200_OK
+        assert second.data == first.data
+    
+    def test_write_invalidates_cached_list(self, api_client, user, idea, campaign, django_capture_on_commit_callbacks):
+        """Test idea writes bump the generations cached lists depend on."""
+        api_client.force_authenticate(user=user)
+        api_client.get(f'/api/v1/ideas/?campaign={campaign.id}')
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            new_idea = Idea.objects.create(
+                title='Fresh idea',
+                description='Created after caching',
+                expected_impact='LOW',
+                submitter=user,
+                campaign=campaign
+            )
+        
+        response = api_client.get(f'/api/v1/ideas/?campaign={campaign.id}')
+        
+        assert str(new_idea.id) in [item['id'] for item in response.data['results']]
+    
+    def test_moved_idea_leaves_old_campaign_list(self, api_client, user, idea, campaign,
+                                                 django_capture_on_commit_callbacks):
+        """Test moving an idea invalidates the list of the campaign it left."""
+        api_client.force_authenticate(user=user)
+        api_client.get(f'/api/v1/ideas/?campaign={campaign.id}')
+        other_campaign = Campaign.objects.create(
+            name='Other Campaign',
+            description='Other campaign description',
+            status='ACTIVE',
+            start_date=campaign.start_date,
+            end_date=campaign.end_date
+        )
+        
+        moved = Idea.objects.get(pk=idea.pk)
+        moved.campaign = other_campaign
+        with django_capture_on_commit_callbacks(execute=True):
+            moved.save()
+        
+        response = api_client.get(f'/api/v1/ideas/?campaign={campaign.id}')
+        
+        assert str(idea.id) not in [item['id'] for item in response.data['results']]
+    
+    def test_campaign_edit_invalidates_cached_detail(self, api_client, user, idea, campaign,
+                                                     django_capture_on_commit_callbacks):
+        """Test renaming a campaign refreshes the embedded copy and the ETag."""
+        api_client.force_authenticate(user=user)
+        etag = api_client.get(f'/api/v1/ideas/{idea.id}/')['ETag']
+        
+        campaign.name = 'Renamed Campaign'
+        with django_capture_on_commit_callbacks(execute=True):
+            campaign.save()
+        
+        response = api_client.get(f'/api/v1/ideas/{idea.id}/', HTTP_IF_NONE_MATCH=etag)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+        assert response.data['campaign']['name'] == 'Renamed Campaign'
+    
+    def test_user_edit_invalidates_cached_detail(self, api_client, user, idea,
+                                                 django_capture_on_commit_callbacks):
+        """Test renaming the submitter refreshes the embedded profile and the ETag."""
+        api_client.force_authenticate(user=user)
+        etag = api_client.get(f'/api/v1/ideas/{idea.id}/')['ETag']
+        
+        user.first_name = 'Renamed'
+        with django_capture_on_commit_callbacks(execute=True):
+            user.save()
+        
+        response = api_client.get(f'/api/v1/ideas/{idea.id}/', HTTP_IF_NONE_MATCH=etag)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+        assert response.data['submitter']['first_name'] == 'Renamed'
+    
+    def test_cache_stats(self, api_client, admin_user):
+        """Test cache hit and miss counters are exposed to admins."""
+        api_client.force_authenticate(user=admin_user)
+        api_client.get('/api/v1/ideas/')
+        api_client.get('/api/v1/ideas/')
+        
+        response = api_client.get('/api/v1/ideas/cache_stats/')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['ideas_list']['hits'] == 1
+        assert response.data['ideas_list']['misses'] == 1
+
+
+class TestConditionalGet:
+    """Tests for ETag / If-None-Match on detail endpoints."""
+    
+    def test_idea_not_modified(self, api_client, user, idea, django_assert_num_queries):
+        """Test a matching If-None-Match returns 304 with a single version query."""
+        api_client.force_authenticate(user=user)
+        
+        response = api_client.get(f'/api/v1/ideas/{idea.id}/')
+        etag = response['ETag']
+        
+        with django_assert_num_queries(1):
+            response = api_client.get(f'/api/v1/ideas/{idea.id}/', HTTP_IF_NONE_MATCH=etag)
+        
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+    
+    def test_idea_etag_changes_with_children(self, api_client, user, idea, db):
+        """Test adding a contributor changes the idea ETag."""
+        api_client.force_authenticate(user=user)
+        etag = api_client.get(f'/api/v1/ideas/{idea.id}/')['ETag']
+        
+        other_user = User.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='pass123'
+        )
+        Contributor.objects.create(idea=idea, user=other_user, role='CONTRIBUTOR')
+        
+        response = api_client.get(f'/api/v1/ideas/{idea.id}/', HTTP_IF_NONE_MATCH=etag)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+    
+    def test_campaign_not_modified(self, api_client, user, campaign):
+        """Test campaign detail honours If-None-Match."""
+        api_client.force_authenticate(user=user)
+        etag = api_client.get(f'/api/v1/campaigns/{campaign.id}/')['ETag']
+        
+        response = api_client.get(f'/api/v1/campaigns/{campaign.id}/', HTTP_IF_NONE_MATCH=etag)
+        
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+class TestSparseFieldsets:
+    """Tests for ?fields= and ?expand= on idea endpoints."""
+    
+    def test_list_fields(self, api_client, user, idea, django_assert_num_queries):
+        """Test list rows only contain the requested fields."""
+        api_client.force_authenticate(user=user)
+        
+        with django_assert_num_queries(1):
+            response = api_client.get('/api/v1/ideas/?fields=id,title')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data['results'][0]) == {'id', 'title'}
+    
+    def test_detail_expand_skips_unrequested_relations(self, api_client, user, idea, django_assert_num_queries):
+        """Test detail only embeds expanded relations and skips other prefetches."""
+        api_client.force_authenticate(user=user)
+        
+        with django_assert_num_queries(2):
+            response = api_client.get(f'/api/v1/ideas/{idea.id}/?fields=id,title&expand=campaign')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data) == {'id', 'title', 'campaign'}
+        assert response.data['campaign']['name'] == idea.campaign.name
+    
+    def test_default_representation_unchanged(self, api_client, user, idea):
+        """Test requests without params keep the full payload."""
+        api_client.force_authenticate(user=user)
+        
+        response = api_client.get(f'/api/v1/ideas/{idea.id}/')
+        
+        assert 'contributors' in response.data
+        assert 'documents' in response.data
+
+
+class TestFastListSerialization:
+    """Tests for the values() fast path of the idea list."""
+    
+    def test_fast_path_matches_model_serializer(self, idea):
+        """Test the fast path renders byte-identical JSON."""
+        from rest_framework.renderers import JSONRenderer
+        from .fast_serializers import ValuesRowSerializer
+        from .serializers import IdeaListSerializer
+        
+        fast = ValuesRowSerializer(IdeaListSerializer)
+        queryset = Idea.objects.select_related('submitter')
+        
+        expected = JSONRenderer().render(IdeaListSerializer(queryset, many=True).data)
+        actual = JSONRenderer().render(fast.serialize(queryset.values(*fast.columns)))
+        
+        assert actual == expected
+    
+    def test_list_endpoint_fast_path(self, api_client, user, idea, settings, locmem_cache):
+        """Test the list endpoint returns the same payload with the fast path enabled."""
+        api_client.force_authenticate(user=user)
+        
+        expected = api_client.get('/api/v1/ideas/').content
+        
+        locmem_cache.clear()
+        settings.IDEA_FAST_LIST_SERIALIZATION = True
+        actual = api_client.get('/api/v1/ideas/').content
+        
+        assert actual == expected
+
+
+class TestIdeaVisibility:
+    """Tests for the non-staff visibility rule and the partial indexes behind it."""
+    
+    @pytest.fixture
+    def other_user(self, db):
+        """Create a user who does not own the test idea."""
+        return User.objects.create_user(username='other', email='other@example.com', password='pass123')
+    
+    def test_drafts_hidden_from_other_users(self, api_client, other_user, idea):
+        """Test a non-owner can neither list nor retrieve someone else's draft."""
+        api_client.force_authenticate(user=other_user)
+        
+        listed = api_client.get('/api/v1/ideas/')
+        detail = api_client.get(f'/api/v1/ideas/{idea.id}/')
+        
+        assert str(idea.id) not in [item['id'] for item in listed.data['results']]
+        assert detail.status_code == status.HTTP_404_NOT_FOUND
+    
+    def test_owner_sees_own_drafts(self, api_client, user, idea):
+        """Test the submitter lists and retrieves their own draft."""
+        api_client.force_authenticate(user=user)
+        
+        listed = api_client.get('/api/v1/ideas/')
+        detail = api_client.get(f'/api/v1/ideas/{idea.id}/')
+        
+        assert str(idea.id) in [item['id'] for item in listed.data['results']]
+        assert detail.status_code == status.HTTP_200_OK
+    
+    def test_submitted_ideas_visible_to_everyone(self, api_client, other_user, idea):
+        """Test any user sees ideas in a public status."""
+        Idea.objects.filter(pk=idea.pk).update(status='SUBMITTED')
+        api_client.force_authenticate(user=other_user)
+        
+        listed = api_client.get('/api/v1/ideas/')
+        
+        assert str(idea.id) in [item['id'] for item in listed.data['results']]
+
+
+@pytest.mark.slow
+class TestVisibilityQueryPlan:
+    """EXPLAIN-based regression tests for the non-staff visibility query."""
+    
+    @pytest.fixture
+    def seeded_ideas(self, user, campaign, db):
+        """
+        Seed 20,000 ideas and ANALYZE them.
+        
+        The user submitted a fifth of them, nine in ten public; other users'
+        ideas are a quarter public. On this mix the old `submitter OR public`
+        filter is planned as a Seq Scan while the drafts-only private arm
+        keeps the visible set on indexes.
+        """
+        from django.db import connection
+        
+        others = User.objects.bulk_create([
+            User(username=f'seed{i}', email=f'seed{i}@example.com', password='!')
+            for i in range(200)
+        ])
+        ideas = []
+        for i in range(20000):
+            own = i % 100 < 20
+            public = i % 10 != 0 if own else i % 100 < 40
+            ideas.append(Idea(
+                title=f'Seeded idea {i}',
+                description='Seeded for query plan tests',
+                expected_impact='MEDIUM',
+                submitter=user if own else others[i % len(others)],
+                campaign=campaign,
+                status='SUBMITTED' if public else 'DRAFT'
+            ))
+        Idea.objects.bulk_create(ideas, batch_size=2000)
+        
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Idea._meta.db_table}')
+    
+    def test_visible_ideas_avoid_seq_scan(self, user, seeded_ideas):
+        """Test the whole visible set for a non-staff user is read through indexes."""
+        plan = Idea.objects.visible_to(user).order_by('-created_at', '-id').explain()
+        
+        assert f'Seq Scan on {Idea._meta.db_table}' not in plan, plan
+    
+    def test_list_page_avoids_seq_scan(self, user, seeded_ideas):
+        """Test a list page for a non-staff user is served from indexes."""
+        plan = Idea.objects.visible_to(user).order_by('-created_at', '-id')[:21].explain()
+        
+        assert f'Seq Scan on {Idea._meta.db_table}' not in plan, plan
+
+
+@pytest.mark.django_db
+class TestBulkImport:
+    """Tests for the bulk idea import endpoint."""
+    
+    def _upload(self, name, content):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        return SimpleUploadedFile(name, content.encode('utf-8'))
+    
+    def test_import_csv(self, api_client, admin_user, campaign, django_assert_max_num_queries):
+        """Test a CSV import creates ideas and contributors with a constant number of queries."""
+        api_client.force_authenticate(user=admin_user)
+        lines = ['title,description,expected_impact,campaign_id']
+        lines += [f'Imported idea {i},Gathered offline,MEDIUM,{campaign.id}' for i in range(50)]
+        
+        with django_assert_max_num_queries(10):
+            response = api_client.post('/api/v1/ideas/import/', {'file': self._upload('ideas.csv', '\n'.join(lines))})
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['created'] == 50
+        imported = Idea.objects.filter(title__startswith='Imported idea')
+        assert imported.count() == 50
+        assert Contributor.objects.filter(idea__in=imported, role='SUBMITTER').count() == 50
+        assert set(imported.values_list('contributor_count', flat=True)) == {1}
+        assert not imported.filter(search_vector__isnull=True).exists()
+    
+    def test_import_ndjson_reports_row_errors(self, api_client, admin_user, idea, campaign):
+        """Test invalid, duplicate and unknown-campaign rows are reported while valid rows import."""
+        import json
+        import uuid
+        
+        api_client.force_authenticate(user=admin_user)
+        rows = [
+            {'title': 'Good idea', 'description': 'Fine', 'expected_impact': 'LOW', 'campaign_id': str(campaign.id)},
+            {'title': 'Bad impact', 'description': 'Fine', 'expected_impact': 'HUGE', 'campaign_id': str(campaign.id)},
+            {'title': idea.title, 'description': 'Exists already', 'expected_impact': 'LOW', 'campaign_id': str(campaign.id)},
+            {'title': 'Good idea', 'description': 'Repeated in file', 'expected_impact': 'LOW', 'campaign_id': str(campaign.id)},
+            {'title': 'Lost idea', 'description': 'Fine', 'expected_impact': 'LOW', 'campaign_id': str(uuid.uuid4())},
+        ]
+        content = '\n'.join(json.dumps(row) for row in rows) + '\nnot json\n'
+        
+        response = api_client.post('/api/v1/ideas/import/', {'file': self._upload('ideas.ndjson', content)})
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['created'] == 1
+        assert sorted(error['row'] for error in response.data['errors']) == [2, 3, 4, 5, 6]
+    
+    def test_import_requires_admin(self, api_client, user, campaign):
+        """Test regular users cannot bulk import."""
+        api_client.force_authenticate(user=user)
+        
+        response = api_client.post('/api/v1/ideas/import/', {'file': self._upload('ideas.csv', 'title\n')})
+        
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestIdeaExport:
+    """Tests for the streaming idea export."""
+    
+    def test_export_csv(self, api_client, user, idea, campaign):
+        """Test CSV export streams a header and the filtered ideas."""
+        Idea.objects.create(
+            title='Other status', description='Filtered out', expected_impact='LOW',
+            submitter=user, campaign=campaign, status='SUBMITTED'
+        )
+        api_client.force_authenticate(user=user)
+        
+        response = api_client.get('/api/v1/ideas/export/?status=DRAFT')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        assert lines[0].startswith('id,title,description')
+        assert len(lines) == 2
+        assert str(idea.id) in lines[1]
+    
+    def test_export_ndjson(self, api_client, user, idea):
+        """Test NDJSON export emits one object per idea."""
+        import json
+        
+        api_client.force_authenticate(user=user)
+        
+        response = api_client.get('/api/v1/ideas/export/?export_format=ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        
+        assert response['Content-Type'] == 'application/x-ndjson'
+        assert rows[0]['id'] == str(idea.id)
+        assert rows[0]['submitter_username'] == user.username
+    
+    def test_export_respects_visibility(self, api_client, admin_user, idea):
+        """Test other users' drafts are not exported to regular users."""
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass123')
+        api_client.force_authenticate(user=other)
+        
+        response = api_client.get('/api/v1/ideas/export/?export_format=ndjson')
+        
+        assert b''.join(response.streaming_content) == b''
+    
+    def test_export_rejects_unknown_format(self, api_client, user):
+        """Test unknown export formats are rejected."""
+        api_client.force_authenticate(user=user)
+        
+        response = api_client.get('/api/v1/ideas/export/?export_format=xlsx')
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestCampaignStats:
+    """Tests for the incrementally maintained campaign stats."""
+    
+    def test_counts_follow_writes(self, user, idea, campaign):
+        """Test idea, status and child writes move the campaign counters."""
+        stats = CampaignStats.objects.get(campaign=campaign)
+        assert (stats.draft_count, stats.high_count, stats.contributor_count) == (1, 1, 1)
+        
+        idea.status = 'SUBMITTED'
+        idea.expected_impact = 'LOW'
+        idea.save()
+        Document.objects.create(idea=idea, file_name='a.pdf', file_path='a.pdf', file_size=1, file_type='pdf')
+        
+        stats.refresh_from_db()
+        assert (stats.draft_count, stats.submitted_count) == (0, 1)
+        assert (stats.high_count, stats.low_count) == (0, 1)
+        assert stats.idea_count == 1
+        assert stats.document_count == 1
+        
+        idea.delete()
+        
+        stats.refresh_from_db()
+        assert stats.idea_count == 0
+        assert (stats.low_count, stats.contributor_count, stats.document_count) == (0, 0, 0)
+    
+    def test_stats_endpoint(self, api_client, user, idea, campaign, django_assert_max_num_queries):
+        """Test the stats action reads the rollup instead of aggregating ideas."""
+        api_client.force_authenticate(user=user)
+        
+        with django_assert_max_num_queries(2):
+            response = api_client.get(f'/api/v1/campaigns/{campaign.id}/stats/')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['idea_count'] == 1
+        assert response.data['by_status']['DRAFT'] == 1
+        assert response.data['by_impact']['HIGH'] == 1
+        assert response.data['contributor_count'] == 1
+    
+    def test_reconcile_corrects_drift(self, idea, campaign):
+        """Test the nightly reconciliation rewrites drifted counters."""
+        from celery_tasks.stats_tasks import reconcile_campaign_stats
+        
+        CampaignStats.objects.filter(campaign=campaign).update(draft_count=7, contributor_count=0)
+        
+        assert reconcile_campaign_stats() == 1
+        stats = CampaignStats.objects.get(campaign=campaign)
+        assert (stats.draft_count, stats.contributor_count) == (1, 1)
+        assert reconcile_campaign_stats() == 0
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Point the shared Redis client at an in-memory fake."""
+    import fakeredis
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr('common.redis_client._client', client)
+    return client
+
+
+@pytest.mark.django_db
+class TestLeaderboards:
+    """Tests for the Redis sorted-set leaderboards."""
+    
+    def test_submission_and_recognition_score(self, user, idea, campaign, fake_redis, django_capture_on_commit_callbacks):
+        """Test status transitions move points for the submitter and contributors."""
+        from . import leaderboard
+        
+        other = User.objects.create_user(username='helper', email='helper@example.com', password='pass123')
+        with django_capture_on_commit_callbacks(execute=True):
+            Contributor.objects.create(idea=idea, user=other, role='CONTRIBUTOR')
+            idea.status = 'SUBMITTED'
+            idea.save()
+        
+        assert leaderboard.top('submitters') == [(user.id, 10)]
+        assert leaderboard.top('contributors', campaign.id) == [(other.id, 10)]
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            idea.status = 'RECOGNIZED'
+            idea.save()
+        
+        assert leaderboard.rank('submitters', user.id) == (1, 60)
+        assert leaderboard.rank('contributors', other.id, campaign.id) == (1, 60)
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            idea.delete()
+        
+        assert leaderboard.rank('submitters', user.id) == (1, 0)
+        assert leaderboard.rank('contributors', other.id) == (1, 0)
+    
+    def test_rebuild_matches_incremental(self, user, idea, campaign, fake_redis, django_capture_on_commit_callbacks):
+        """Test rebuild regenerates the boards from Postgres."""
+        from . import leaderboard
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            idea.status = 'SUBMITTED'
+            idea.save()
+        incremental = leaderboard.top('submitters', campaign.id)
+        fake_redis.flushall()
+        fake_redis.zadd(leaderboard.board_key('submitters', 'gone'), {'1': 5})
+        
+        leaderboard.rebuild()
+        
+        assert leaderboard.top('submitters', campaign.id) == incremental
+        assert not fake_redis.exists(leaderboard.board_key('submitters', 'gone'))
+    
+    def test_leaderboard_endpoints(self, api_client, user, idea, fake_redis, django_capture_on_commit_callbacks):
+        """Test the top-N and my-rank endpoints."""
+        with django_capture_on_commit_callbacks(execute=True):
+            idea.status = 'SUBMITTED'
+            idea.save()
+        api_client.force_authenticate(user=user)
+        
+        top = api_client.get('/api/v1/leaderboards/submitters/?limit=5')
+        me = api_client.get('/api/v1/leaderboards/submitters/me/')
+        
+        assert top.status_code == status.HTTP_200_OK
+        assert top.data['results'][0]['user']['id'] == user.id
+        assert top.data['results'][0]['rank'] == 1
+        assert me.data == {'board': 'submitters', 'rank': 1, 'score': 10}
+
+
+@pytest.mark.django_db
+class TestSubmissionRollups:
+    """Tests for the submission time-series rollup."""
+    
+    def _submit(self, user, campaign, title, submitted_at, status='SUBMITTED'):
+        return Idea.objects.create(
+            title=title, description='Rolled up', expected_impact='LOW',
+            submitter=user, campaign=campaign, status=status, submitted_at=submitted_at
+        )
+    
+    def test_refresh_processes_changes_since_watermark(self, user, campaign):
+        """Test the refresh fills buckets and only rescans changed ideas."""
+        from celery_tasks.stats_tasks import refresh_submission_rollups
+        from django.utils import timezone
+        
+        day = timezone.now() - timedelta(days=3)
+        first = self._submit(user, campaign, 'First', day)
+        self._submit(user, campaign, 'Second', day)
+        
+        assert refresh_submission_rollups() == 1
+        assert SubmissionRollup.objects.get(campaign=campaign, status='SUBMITTED').count == 2
+        assert refresh_submission_rollups() == 1  # inside the overlap window
+        
+        first.status = 'RECOGNIZED'
+        first.save()
+        refresh_submission_rollups()
+        
+        counts = dict(SubmissionRollup.objects.filter(campaign=campaign).values_list('status', 'count'))
+        assert counts == {'SUBMITTED': 1, 'RECOGNIZED': 1}
+        
+        first.delete()
+        assert dict(SubmissionRollup.objects.filter(campaign=campaign).values_list('status', 'count'))['RECOGNIZED'] == 0
+    
+    def test_submissions_endpoint(self, api_client, user, campaign):
+        """Test the range query reads the rollup by day and by week."""
+        from celery_tasks.stats_tasks import refresh_submission_rollups
+        from django.utils import timezone
+        
+        now = timezone.now()
+        self._submit(user, campaign, 'Today', now)
+        self._submit(user, campaign, 'Yesterday', now - timedelta(days=1))
+        self._submit(user, campaign, 'Old', now - timedelta(days=60))
+        refresh_submission_rollups()
+        api_client.force_authenticate(user=user)
+        start = (now - timedelta(days=7)).date().isoformat()
+        
+        daily = api_client.get(f'/api/v1/campaigns/{campaign.id}/submissions/?start={start}')
+        weekly = api_client.get(f'/api/v1/campaigns/{campaign.id}/submissions/?interval=week')
+        
+        assert daily.status_code == status.HTTP_200_OK
+        assert [row['count'] for row in daily.data['results']] == [1, 1]
+        assert sum(row['count'] for row in weekly.data['results']) == 3
+    
+    def test_submissions_rejects_bad_params(self, api_client, user, campaign):
+        """Test invalid interval and dates are rejected."""
+        api_client.force_authenticate(user=user)
+        
+        assert api_client.get(f'/api/v1/campaigns/{campaign.id}/submissions/?interval=hour').status_code == 400
+        assert api_client.get(f'/api/v1/campaigns/{campaign.id}/submissions/?start=soon').status_code == 400
+
+
+@pytest.mark.django_db
+class TestNearDuplicateDetection:
+    """Tests for trigram near-duplicate detection."""
+    
+    @pytest.fixture
+    def public_idea(self, admin_user, campaign):
+        return Idea.objects.create(
+            title='Test Idea for the team', description='Already submitted', expected_impact='LOW',
+            submitter=admin_user, campaign=campaign, status='SUBMITTED'
+        )
+    
+    def test_find_similar_ideas(self, user, idea, public_idea, campaign):
+        """Test reworded titles match and unrelated or invisible ideas do not."""
+        from .search import find_similar_ideas
+        
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass123')
+        
+        similar = find_similar_ideas(Idea.objects.visible_to(other), campaign.id, 'Test ideas for our team')
+        unrelated = find_similar_ideas(Idea.objects.visible_to(other), campaign.id, 'Reduce cloud spend')
+        
+        # The draft fixture idea belongs to another user and is never disclosed
+        assert [row['id'] for row in similar] == [public_idea.id]
+        assert unrelated == []
+    
+    def test_create_reports_similar_ideas(self, user, public_idea, campaign):
+        """Test IdeaCreateSerializer rejects near-duplicates unless ignore_similar is set."""
+        from rest_framework.test import APIRequestFactory
+        from .serializers import IdeaCreateSerializer
+        
+        request = APIRequestFactory().post('/api/v1/ideas/')
+        request.user = user
+        data = {'title': 'Test Ideas for the team', 'description': 'Reworded', 'expected_impact': 'LOW', 'campaign_id': campaign.id}
+        
+        serializer = IdeaCreateSerializer(data=data, context={'request': request})
+        assert not serializer.is_valid()
+        assert serializer.errors['similar_ideas'][0]['id'] == str(public_idea.id)
+        
+        serializer = IdeaCreateSerializer(data={**data, 'ignore_similar': True}, context={'request': request})
+        assert serializer.is_valid()
+    
+    def test_submit_reports_similar_ideas(self, api_client, user, campaign, public_idea):
+        """Test submit returns similar ideas, and proceeds with ignore_similar."""
+        draft = Idea.objects.create(
+            title='Test idea for the teams', description='Reworded draft', expected_impact='LOW',
+            submitter=user, campaign=campaign
+        )
+        api_client.force_authenticate(user=user)
+        
+        blocked = api_client.post(f'/api/v1/ideas/{draft.id}/submit/', {}, format='json')
+        allowed = api_client.post(f'/api/v1/ideas/{draft.id}/submit/', {'ignore_similar': True}, format='json')
+        
+        assert blocked.status_code == status.HTTP_400_BAD_REQUEST
+        assert blocked.data['similar_ideas'][0]['id'] == str(public_idea.id)
+        assert allowed.status_code == status.HTTP_200_OK
+        assert allowed.data['status'] == 'SUBMITTED'
+
+
+@pytest.mark.django_db
+class TestIdempotencyKeys:
+    """Tests for Idempotency-Key replay on idea writes."""
+    
+    def _create(self, api_client, campaign, key, title='Retried idea'):
+        data = {'title': title, 'description': 'Sent twice', 'expected_impact': 'LOW', 'campaign_id': str(campaign.id)}
+        return api_client.post('/api/v1/ideas/', data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+    
+    def test_retried_create_is_replayed(self, api_client, user, campaign):
+        """Test a repeated key returns the first response without creating again."""
+        api_client.force_authenticate(user=user)
+        
+        first = self._create(api_client, campaign, 'create-1')
+        second = self._create(api_client, campaign, 'create-1')
+        
+        assert first.status_code == status.HTTP_201_CREATED
+        assert second.status_code == status.HTTP_201_CREATED
+        assert second.data == first.data
+        assert second['Idempotent-Replayed'] == 'true'
+        assert Idea.objects.filter(title='Retried idea').count() == 1
+    
+    def test_key_reused_with_different_payload(self, api_client, user, campaign):
+        """Test reusing a key for a different request is rejected."""
+        api_client.force_authenticate(user=user)
+        self._create(api_client, campaign, 'create-2')
+        
+        response = self._create(api_client, campaign, 'create-2', title='Something else')
+        
+        assert response.status_code == 422
+    
+    def test_duplicate_create_without_key_conflicts(self, api_client, user, campaign):
+        """Test a duplicate (title, campaign) without a key is a 409, not a 500."""
+        api_client.force_authenticate(user=user)
+        data = {
+            'title': 'Retried idea', 'description': 'Sent twice', 'expected_impact': 'LOW',
+            'campaign_id': str(campaign.id), 'ignore_similar': True
+        }
+        api_client.post('/api/v1/ideas/', data, format='json')
+        
+        response = api_client.post('/api/v1/ideas/', data, format='json')
+        
+        assert response.status_code == status.HTTP_409_CONFLICT
+    
+    def test_retried_submit_is_replayed(self, api_client, user, idea):
+        """Test a retried submit replays the success instead of failing on the new status."""
+        api_client.force_authenticate(user=user)
+        
+        first = api_client.post(f'/api/v1/ideas/{idea.id}/submit/', {}, format='json', HTTP_IDEMPOTENCY_KEY='submit-1')
+        second = api_client.post(f'/api/v1/ideas/{idea.id}/submit/', {}, format='json', HTTP_IDEMPOTENCY_KEY='submit-1')
+        
+        assert first.status_code == status.HTTP_200_OK
+        assert second.status_code == status.HTTP_200_OK
+        assert second.data['status'] == 'SUBMITTED'
+    
+    def test_in_flight_key_conflicts(self, api_client, user, idea):
+        """Test a duplicate arriving while the first request runs gets a 409."""
+        import hashlib
+        
+        digest = hashlib.sha256(b'submit-2').hexdigest()
+        cache.add(f'idem:lock:{user.pk}:ideas.submit:{digest}', 'in-flight')
+        api_client.force_authenticate(user=user)
+        
+        response = api_client.post(f'/api/v1/ideas/{idea.id}/submit/', {}, format='json', HTTP_IDEMPOTENCY_KEY='submit-2')
+        
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+
+@pytest.mark.django_db
+class TestBatchAddContributors:
+    """Tests for adding contributors in one request."""
+    
+    def test_add_contributors_by_id_and_email(self, api_client, user, idea, campaign, django_assert_max_num_queries):
+        """Test users are resolved together and only missing contributors are inserted."""
+        helpers = [
+            User.objects.create_user(username=f'helper{i}', email=f'helper{i}@example.com', password='pass123')
+            for i in range(3)
+        ]
+        api_client.force_authenticate(user=user)
+        data = {
+            'user_ids': [helpers[0].id, user.id, 999999],
+            'emails': ['HELPER1@example.com', helpers[2].email, 'nobody@example.com'],
+        }
+        
+        with django_assert_max_num_queries(15):
+            response = api_client.post(f'/api/v1/ideas/{idea.id}/add_contributors/', data, format='json')
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        assert sorted(item['user']['id'] for item in response.data['added']) == sorted(h.id for h in helpers)
+        assert response.data['already_contributors'] == [user.id]
+        assert response.data['not_found'] == {'user_ids': [999999], 'emails': ['nobody@example.com']}
+        idea.refresh_from_db()
+        assert idea.contributor_count == 4
+        assert CampaignStats.objects.get(campaign=campaign).contributor_count == 4
+    
+    def test_add_contributors_requires_users(self, api_client, user, idea):
+        """Test an empty batch is rejected."""
+        api_client.force_authenticate(user=user)
+        
+        response = api_client.post(f'/api/v1/ideas/{idea.id}/add_contributors/', {}, format='json')
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_add_contributors_only_by_submitter(self, api_client, idea):
+        """Test only the submitter may add contributors."""
+        idea.status = 'SUBMITTED'
+        idea.save()
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass123')
+        api_client.force_authenticate(user=other)
+        
+        response = api_client.post(f'/api/v1/ideas/{idea.id}/add_contributors/', {'user_ids': [other.id]}, format='json')
+        
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestPermissionMemo:
+    """Tests for ID-based permissions and the per-request contributed-ideas memo."""
+    
+    def _request(self, user, method='post'):
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        
+        request = Request(getattr(APIRequestFactory(), method)('/'))
+        request.user = user
+        return request
+    
+    def test_object_checks_share_one_query(self, user, idea, campaign, django_assert_num_queries):
+        """Test IsContributor loads the memo once and IsSubmitterOrReadOnly never queries."""
+        from .permissions import IsContributor, IsSubmitterOrReadOnly
+        
+        other = Idea.objects.create(
+            title='Not mine', description='Someone else', expected_impact='LOW',
+            submitter=User.objects.create_user(username='other', email='other@example.com', password='pass123'),
+            campaign=campaign
+        )
+        ideas = list(Idea.objects.filter(pk__in=[idea.pk, other.pk]))
+        request = self._request(user)
+        
+        with django_assert_num_queries(1):
+            allowed = [IsContributor().has_object_permission(request, None, obj) for obj in ideas * 3]
+        with django_assert_num_queries(0):
+            owned = [IsSubmitterOrReadOnly().has_object_permission(request, None, obj) for obj in ideas]
+        
+        by_id = {obj.pk: result for obj, result in zip(ideas, owned)}
+        assert allowed.count(True) == 3
+        assert by_id == {idea.pk: True, other.pk: False}
+    
+    def test_submitter_check_on_documents(self, user, idea):
+        """Test objects that belong to an idea are checked against the idea's submitter."""
+        from .permissions import IsSubmitterOrReadOnly
+        
+        document = Document.objects.create(idea=idea, file_name='a.pdf', file_path='a.pdf', file_size=1, file_type='pdf')
+        
+        assert IsSubmitterOrReadOnly().has_object_permission(self._request(user), None, document)
+    
+    def test_contributed_filter(self, api_client, user, idea, campaign):
+        """Test ?contributed= restricts the list to ideas the user contributes to."""
+        idea.status = 'SUBMITTED'
+        idea.save()
+        other = User.objects.create_user(username='other', email='other@example.com', password='pass123')
+        Idea.objects.create(
+            title='Public idea', description='Not contributed', expected_impact='LOW',
+            submitter=other, campaign=campaign, status='SUBMITTED'
+        )
+        api_client.force_authenticate(user=user)
+        
+        mine = api_client.get('/api/v1/ideas/?contributed=true')
+        others = api_client.get('/api/v1/ideas/?contributed=false')
+        
+        assert [item['id'] for item in mine.data['results']] == [str(idea.id)]
+        assert [item['title'] for item in others.data['results']] == ['Public idea']
+    
+    def test_contributed_filter_cached_per_staff_user(self, api_client, admin_user, idea, campaign):
+        """Test two staff users with the same ?contributed= URL do not share a cached page."""
+        other_admin = User.objects.create_user(
+            username='admin2', email='admin2@example.com', password='pass123', is_staff=True
+        )
+        theirs = Idea.objects.create(
+            title='Second admin idea', description='Contributed by admin2', expected_impact='LOW',
+            submitter=other_admin, campaign=campaign, status='SUBMITTED'
+        )
+        Contributor.objects.create(idea=theirs, user=other_admin, role='SUBMITTER')
+        
+        api_client.force_authenticate(user=admin_user)
+        first = api_client.get('/api/v1/ideas/?contributed=true')
+        api_client.force_authenticate(user=other_admin)
+        second = api_client.get('/api/v1/ideas/?contributed=true')
+        
+        assert first.data['results'] == []
+        assert [item['id'] for item in second.data['results']] == [str(theirs.id)]
+
+
+@pytest.mark.django_db
+class TestAutocomplete:
+    """Tests for the title and campaign name typeahead."""
+    
+    def test_prefix_matches(self, api_client, user, idea, campaign):
+        """Test prefixes match public titles and campaign names case-insensitively."""
+        Idea.objects.create(
+            title='Q1 hackathon kit', description='Public', expected_impact='LOW',
+            submitter=user, campaign=campaign, status='SUBMITTED'
+        )
+        api_client.force_authenticate(user=user)
+        
+        response = api_client.get('/api/v1/ideas/autocomplete/?q=q1')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['title'] for item in response.data['ideas']] == ['Q1 hackathon kit']
+        assert [item['name'] for item in response.data['campaigns']] == [campaign.name]
+        assert set(response.data['ideas'][0]) == {'id', 'title'}
+    
+    def test_drafts_and_short_prefixes_are_not_suggested(self, api_client, user, idea):
+        """Test drafts stay private and one-letter prefixes return nothing."""
+        api_client.force_authenticate(user=user)
+        
+        assert api_client.get('/api/v1/ideas/autocomplete/?q=test').data['ideas'] == []
+        assert api_client.get('/api/v1/ideas/autocomplete/?q=t').data == {'ideas': [], 'campaigns': []}
+    
+    def test_hot_prefix_served_from_cache(self, api_client, user, campaign, django_assert_num_queries):
+        """Test a repeated prefix does not query the database."""
+        api_client.force_authenticate(user=user)
+        api_client.get('/api/v1/ideas/autocomplete/?q=q1&limit=5')
+        
+        with django_assert_num_queries(0):
+            response = api_client.get('/api/v1/ideas/autocomplete/?q=Q1 &limit=5')
+        
+        assert response.data['campaigns'][0]['name'] == campaign.name
@@ -2,23 +2,54 @@
 Views for Ideas app.
 """
 
-from rest_framework import viewsets, status, filters
+import io
+import os
+from rest_framework import viewsets, status, filters, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 from django_filters.rest_framework import DjangoFilterBackend
+from celery import group
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import StreamingHttpResponse
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Lower, TruncWeek
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 
-from .models import Idea, Campaign, Contributor, Document
+from .models import Idea, Campaign, CampaignStats, Contributor, Document, SubmissionRollup
 from .serializers import (
     IdeaListSerializer, IdeaDetailSerializer, IdeaCreateSerializer,
-    CampaignSerializer, ContributorSerializer, DocumentSerializer,
-    IdeaSubmitSerializer
+    CampaignSerializer, CampaignStatsSerializer, ContributorSerializer, DocumentSerializer,
+    IdeaSubmitSerializer, SparseFieldsetMixin, UserSerializer, similar_ideas_data,
+    ContributorBatchSerializer
 )
-from .permissions import IsSubmitterOrReadOnly, IsContributor
+from .permissions import IsSubmitterOrReadOnly, IsContributor, IsAdmin
+from .filters import ContributedFilter, FullTextSearchFilter
+from .search import find_similar_ideas
+from .signals import contributors_added
+from .fast_serializers import ValuesRowSerializer
+from .pagination import IdeaCursorPagination, ContributorCursorPagination, DocumentCursorPagination
+from .importers import IdeaImporter, IMPORT_FORMATS, read_rows
+from .exporters import CONTENT_TYPES, EXPORT_FORMATS, stream_export
+from . import leaderboard
+from auth_app.cache import get_user_profiles
+from celery_tasks.submission_tasks import send_contributor_notification
+from common.cache import cached_response_data, get_cache_stats
+from common.idempotency import idempotent
+from common.mixins import ConditionalRetrieveMixin
 
+# Shortest prefix and largest result count accepted by the autocomplete action
+AUTOCOMPLETE_MIN_LENGTH = 2
+AUTOCOMPLETE_MAX_LIMIT = 20
 
-class CampaignViewSet(viewsets.ModelViewSet):
+# Response caches served by IdeaViewSet, reported by the cache_stats action
+IDEA_CACHE_NAMES = ['ideas_list', 'ideas_detail', 'ideas_my', 'ideas_autocomplete']
+
+
+class CampaignViewSet(ConditionalRetrieveMixin, viewsets.ModelViewSet):
     """ViewSet for Campaign model."""
     
     queryset = Campaign.objects.all()
@@ -28,18 +59,77 @@ class CampaignViewSet(viewsets.ModelViewSet):
     filterset_fields = ['status']
     ordering_fields = ['created_at', 'start_date']
     ordering = ['-created_at']
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a campaign, answering If-None-Match with 304."""
+        etag = self.get_object_etag(kwargs[self.lookup_field])
+        handler = super().retrieve
+        return self.conditional_response(request, etag, lambda: handler(request, *args, **kwargs))
+    
+    def get_etag_components(self, pk):
+        """Version a campaign by its updated_at."""
+        return self.get_queryset().filter(pk=pk).values_list('updated_at').first()
+    
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def stats(self, request, pk=None):
+        """Get idea, contributor and document counts from the campaign stats rollup."""
+        campaign = self.get_object()
+        stats = CampaignStats.objects.filter(campaign=campaign).first()
+        if stats is None:
+            CampaignStats.objects.recompute([campaign.pk])
+            stats = CampaignStats.objects.get(campaign=campaign)
+        return Response(CampaignStatsSerializer(stats).data)
+    
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def submissions(self, request, pk=None):
+        """Get submitted ideas per day or week and status, read from the submission rollup."""
+        campaign = self.get_object()
+        interval = request.query_params.get('interval', 'day')
+        if interval not in ('day', 'week'):
+            return Response(
+                {'error': 'interval must be day or week'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        rollups = SubmissionRollup.objects.filter(campaign=campaign)
+        for param, lookup in (('start', 'day__gte'), ('end', 'day__lte')):
+            value = request.query_params.get(param)
+            if value is None:
+                continue
+            try:
+                day = parse_date(value)
+            except ValueError:
+                day = None
+            if day is None:
+                return Response(
+                    {'error': f'{param} must be a date (YYYY-MM-DD)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            rollups = rollups.filter(**{lookup: day})
+        if request.query_params.get('status'):
+            rollups = rollups.filter(status=request.query_params['status'])
+        
+        bucket = TruncWeek('day') if interval == 'week' else F('day')
+        series = (
+            rollups.annotate(bucket=bucket)
+            .values('bucket', 'status')
+            .annotate(count=Sum('count'))
+            .filter(count__gt=0)
+            .order_by('bucket', 'status')
+        )
+        return Response({'interval': interval, 'results': list(series)})
 
 
-class IdeaViewSet(viewsets.ModelViewSet):
+class IdeaViewSet(ConditionalRetrieveMixin, viewsets.ModelViewSet):
     """ViewSet for Idea model."""
     
-    queryset = Idea.objects.select_related('submitter', 'campaign').prefetch_related('contributors', 'documents')
+    queryset = Idea.objects.select_related('campaign')
     permission_classes = [IsAuthenticated, IsSubmitterOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ContributedFilter, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['status', 'expected_impact', 'campaign']
-    search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'updated_at']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
+    pagination_class = IdeaCursorPagination
     
     def get_serializer_class(self):
         """Return appropriate serializer based on action."""
@@ -53,22 +143,118 @@ class IdeaViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Filter ideas based on user role."""
-        user = self.request.user
-        
-        # Admins see all ideas
-        if user.is_staff:
-            return self.queryset
+        # Admins see all ideas; users see their own drafts and all submitted ideas
+        return self._base_queryset().visible_to(self.request.user)
+    
+    def list(self, request, *args, **kwargs):
+        """List ideas, served from the shared response cache when possible."""
+        campaign_id = request.query_params.get('campaign')
+        scopes = [f'campaign:{campaign_id}'] if campaign_id else ['ideas']
+        return self._cached_response('ideas_list', scopes, self._list, request, *args, **kwargs)
+    
+    def _list(self, request, *args, **kwargs):
+        """Build the list response, through the values() fast path when enabled."""
+        if not settings.IDEA_FAST_LIST_SERIALIZATION:
+            return super().list(request, *args, **kwargs)
         
-        # Users see their own ideas and all submitted ideas
-        return self.queryset.filter(
-            models.Q(submitter=user) | models.Q(status__in=['SUBMITTED', 'UNDER_EVALUATION', 'EVALUATED', 'RECOGNIZED'])
+        fast = ValuesRowSerializer(self.get_serializer_class(), context=self.get_serializer_context())
+        queryset = self.filter_queryset(self.get_queryset())
+        # Cursor pagination reads its ordering keys from the row dicts
+        columns = dict.fromkeys(['id', 'created_at', 'updated_at', *fast.columns, *queryset.query.annotations])
+        page = self.paginate_queryset(queryset.values(*columns))
+        return self.get_paginated_response(fast.serialize(page))
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve an idea, answering If-None-Match with 304 and serving from the shared cache."""
+        pk = kwargs[self.lookup_field]
+        self.etag_campaign_id = None
+        etag = self.get_object_etag(pk)
+        handler = super().retrieve
+        # The payload embeds the campaign, so its edits must reach the cached copy
+        scopes = [f'idea:{pk}']
+        if self.etag_campaign_id:
+            scopes.append(f'campaign:{self.etag_campaign_id}')
+        return self.conditional_response(
+            request,
+            etag,
+            lambda: self._cached_response('ideas_detail', scopes, handler, request, *args, **kwargs)
+        )
+    
+    def get_etag_components(self, pk):
+        """Version an idea by its own, its children's and its campaign's updates, without loading children."""
+        components = (
+            self.get_queryset()
+            .prefetch_related(None)
+            .filter(pk=pk)
+            .values_list('updated_at', 'children_version', 'campaign_id', 'campaign__updated_at')
+            .first()
+        )
+        # retrieve scopes the cached payload by the campaign read here
+        self.etag_campaign_id = components[2] if components else None
+        return components
+    
+    def _cached_response(self, name, scopes, handler, request, *args, **kwargs):
+        """Cache the data of a read-only handler, keyed by visibility scope and query params."""
+        user = request.user
+        # Staff share entries unless a filter such as ?contributed= is relative to the user
+        per_user = any(
+            backend().varies_by_user(request)
+            for backend in self.filter_backends
+            if hasattr(backend, 'varies_by_user')
+        )
+        visibility = 'staff' if user.is_staff and not per_user else f'user:{user.pk}'
+        key_parts = (visibility, request.get_host(), request.get_full_path())
+        data = cached_response_data(
+            name,
+            key_parts,
+            scopes,
+            lambda: handler(request, *args, **kwargs).data,
+            settings.IDEA_CACHE_TTL
         )
+        return Response(data)
+    
+    def _base_queryset(self):
+        """Load only the columns and relations the requested representation needs."""
+        serializer_class = self.get_serializer_class()
+        if self.request.method in SAFE_METHODS and issubclass(serializer_class, SparseFieldsetMixin):
+            selected = serializer_class.get_sparse_fields(self.request)
+            if selected is not None:
+                return self._sparse_queryset(selected)
+        
+        # List rows carry denormalized counts; only detail payloads embed children
+        if self.action != 'list':
+            return self.queryset.prefetch_related('contributors', 'documents')
+        return self.queryset
+    
+    def _sparse_queryset(self, selected):
+        """Build a queryset restricted to the selected fields with only()."""
+        # Ordering keys are always loaded so cursor pagination never defers them
+        columns = {'id', 'created_at', 'updated_at'}
+        select = []
+        prefetch = []
+        for name in selected:
+            if name == 'campaign':
+                select.append(name)
+                columns.add(name)
+            elif name == 'contributors':
+                prefetch.append('contributors')
+            elif name == 'documents':
+                prefetch.append('documents')
+            else:
+                columns.add(name)
+        return Idea.objects.select_related(*select).prefetch_related(*prefetch).only(*columns)
+    
+    @idempotent('ideas.create')
+    def create(self, request, *args, **kwargs):
+        """Create an idea, replaying the stored response for a repeated Idempotency-Key."""
+        return super().create(request, *args, **kwargs)
     
     def perform_create(self, serializer):
         """Create idea with current user as submitter."""
         serializer.save(submitter=self.request.user)
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsSubmitterOrReadOnly])
+    @idempotent('ideas.submit')
     def submit(self, request, pk=None):
         """Submit a draft idea."""
         idea = self.get_object()
@@ -79,6 +265,22 @@ class IdeaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        if not serializers.BooleanField().to_internal_value(request.data.get('ignore_similar', False)):
+            similar = find_similar_ideas(
+                Idea.objects.visible_to(request.user),
+                idea.campaign_id,
+                idea.title,
+                exclude_pk=idea.pk
+            )
+            if similar:
+                return Response(
+                    {
+                        'error': 'Similar ideas already exist in this campaign; set ignore_similar to submit anyway',
+                        'similar_ideas': similar_ideas_data(similar)
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
         idea.status = 'SUBMITTED'
         idea.submitted_at = timezone.now()
         idea.save()
@@ -86,6 +288,49 @@ class IdeaViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(idea)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAuthenticated, IsAdmin])
+    def bulk_import(self, request):
+        """Import ideas from an uploaded CSV or NDJSON file, reporting errors per row."""
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response(
+                {'error': 'file is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        import_format = request.data.get('import_format') or os.path.splitext(upload.name)[1].lstrip('.').lower()
+        if import_format not in IMPORT_FORMATS:
+            return Response(
+                {'error': f"import_format must be one of: {', '.join(IMPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Decode the upload lazily so rows are parsed as they are read
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        report = IdeaImporter(request.user).run(read_rows(lines, import_format))
+        
+        response_status = status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST
+        return Response(report, status=response_status)
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def export(self, request):
+        """Stream every visible idea matching the list filters as CSV or NDJSON."""
+        # ?format= is reserved for DRF's renderer negotiation
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"export_format must be one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        response = StreamingHttpResponse(
+            stream_export(queryset, export_format),
+            content_type=CONTENT_TYPES[export_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="ideas.{export_format}"'
+        return response
+    
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsSubmitterOrReadOnly])
     def add_contributor(self, request, pk=None):
         """Add a contributor to an idea."""
@@ -99,7 +344,6 @@ class IdeaViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            from django.contrib.auth.models import User
             user = User.objects.get(id=user_id)
         except User.DoesNotExist:
             return Response(
@@ -119,37 +363,183 @@ class IdeaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        transaction.on_commit(lambda: send_contributor_notification.delay(str(idea.pk), user.pk))
+        
         serializer = ContributorSerializer(contributor)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsSubmitterOrReadOnly])
+    def add_contributors(self, request, pk=None):
+        """Add several contributors by user ID or email in one request."""
+        idea = self.get_object()
+        serializer = ContributorBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_ids = serializer.validated_data['user_ids']
+        emails = serializer.validated_data['emails']
+        
+        # Resolve IDs and emails in one query
+        users = list(
+            User.objects.annotate(email_lower=Lower('email'))
+            .filter(Q(id__in=user_ids) | Q(email_lower__in=emails))
+        )
+        found_ids = {user.id for user in users}
+        found_emails = {user.email_lower for user in users}
+        
+        with transaction.atomic():
+            existing = set(
+                Contributor.objects.filter(idea=idea, user_id__in=found_ids).values_list('user_id', flat=True)
+            )
+            candidates = [
+                Contributor(idea=idea, user=user, role='CONTRIBUTOR')
+                for user in users
+                if user.id not in existing
+            ]
+            Contributor.objects.bulk_create(candidates, ignore_conflicts=True)
+            # bulk_create skips signals and, with ignore_conflicts, does not report
+            # which rows lost a race; keep only the rows that were inserted
+            inserted = set(
+                Contributor.objects.filter(pk__in=[contributor.pk for contributor in candidates])
+                .values_list('pk', flat=True)
+            )
+            added = [contributor for contributor in candidates if contributor.pk in inserted]
+            existing.update(contributor.user_id for contributor in candidates if contributor.pk not in inserted)
+            if added:
+                contributors_added(idea.pk, added)
+                notifications = group(
+                    send_contributor_notification.s(str(idea.pk), contributor.user_id) for contributor in added
+                )
+                transaction.on_commit(notifications.apply_async)
+        
+        return Response(
+            {
+                'added': ContributorSerializer(added, many=True).data,
+                'already_contributors': sorted(existing),
+                'not_found': {
+                    'user_ids': [user_id for user_id in user_ids if user_id not in found_ids],
+                    'emails': [email for email in emails if email not in found_emails],
+                },
+            },
+            status=status.HTTP_201_CREATED if added else status.HTTP_200_OK
+        )
+    
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
     def contributors(self, request, pk=None):
         """List contributors for an idea."""
         idea = self.get_object()
         contributors = idea.contributors.all()
-        serializer = ContributorSerializer(contributors, many=True)
-        return Response(serializer.data)
+        return self._paginated_response(contributors, ContributorSerializer, ContributorCursorPagination)
     
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
     def documents(self, request, pk=None):
         """List documents for an idea."""
         idea = self.get_object()
         documents = idea.documents.all()
-        serializer = DocumentSerializer(documents, many=True)
-        return Response(serializer.data)
+        return self._paginated_response(documents, DocumentSerializer, DocumentCursorPagination)
     
-    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    @action(detail=False, methods=['get'], url_path='my', permission_classes=[IsAuthenticated])
     def my_ideas(self, request):
         """Get current user's ideas."""
-        ideas = self.queryset.filter(submitter=request.user)
-        serializer = self.get_serializer(ideas, many=True)
-        return Response(serializer.data)
+        scopes = [f'user:{request.user.pk}']
+        return self._cached_response('ideas_my', scopes, self._my_ideas, request)
+    
+    def _my_ideas(self, request):
+        """Build the paginated my_ideas response."""
+        ideas = self.get_queryset().filter(submitter=request.user)
+        page = self.paginate_queryset(ideas)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def autocomplete(self, request):
+        """Suggest public idea titles and campaign names starting with ?q=."""
+        prefix = ' '.join(request.query_params.get('q', '').split()).lower()
+        if len(prefix) < AUTOCOMPLETE_MIN_LENGTH:
+            return Response({'ideas': [], 'campaigns': []})
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), AUTOCOMPLETE_MAX_LIMIT)
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Only public ideas are suggested, so one cached entry serves every user
+        data = cached_response_data(
+            'ideas_autocomplete',
+            (prefix, limit),
+            ['ideas'],
+            lambda: self._autocomplete(prefix, limit),
+            settings.IDEA_AUTOCOMPLETE_TTL
+        )
+        return Response(data)
+    
+    def _autocomplete(self, prefix, limit):
+        """Look up title and name prefixes through the UPPER(...) text_pattern_ops indexes."""
+        ideas = (
+            Idea.objects.filter(status__in=Idea.PUBLIC_STATUSES, title__istartswith=prefix)
+            .order_by('title')
+            .values('id', 'title')[:limit]
+        )
+        campaigns = Campaign.objects.filter(name__istartswith=prefix).order_by('name').values('id', 'name')[:limit]
+        return {'ideas': list(ideas), 'campaigns': list(campaigns)}
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsAdmin])
+    def cache_stats(self, request):
+        """Get hit/miss counters for the idea response caches."""
+        return Response(get_cache_stats(IDEA_CACHE_NAMES))
+    
+    def _paginated_response(self, queryset, serializer_class, pagination_class):
+        """Paginate a sub-resource queryset with its own keyset paginator."""
+        paginator = pagination_class()
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        serializer = serializer_class(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
+
+class LeaderboardViewSet(viewsets.ViewSet):
+    """Submitter and contributor leaderboards, global or per campaign (?campaign=)."""
+    
+    permission_classes = [IsAuthenticated]
+    lookup_value_regex = '|'.join(leaderboard.BOARDS)
+    
+    # Largest top-N a client may request
+    MAX_LIMIT = 100
+    
+    def list(self, request):
+        """List the available boards."""
+        return Response({'boards': list(leaderboard.BOARDS)})
+    
+    def retrieve(self, request, pk=None):
+        """Get the top-N users of a board."""
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), self.MAX_LIMIT)
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        entries = leaderboard.top(pk, request.query_params.get('campaign'), max(limit, 1))
+        users = get_user_profiles(user_id for user_id, _ in entries)
+        results = [
+            {'rank': position, 'user': UserSerializer(users[user_id]).data, 'score': score}
+            for position, (user_id, score) in enumerate(entries, start=1)
+            if user_id in users
+        ]
+        return Response({'board': pk, 'results': results})
+    
+    @action(detail=True, methods=['get'])
+    def me(self, request, pk=None):
+        """Get the current user's rank and score on a board."""
+        entry = leaderboard.rank(pk, request.user.pk, request.query_params.get('campaign'))
+        position, score = entry if entry else (None, 0)
+        return Response({'board': pk, 'rank': position, 'score': score})
 
 
 class ContributorViewSet(viewsets.ModelViewSet):
     """ViewSet for Contributor model."""
     
-    queryset = Contributor.objects.select_related('idea', 'user')
+    queryset = Contributor.objects.select_related('idea')
     serializer_class = ContributorSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
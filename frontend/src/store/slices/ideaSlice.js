@@ -8,10 +8,8 @@ const initialState = {
   loading: false,
   error: null,
   pagination: {
-    count: 0,
     next: null,
     previous: null,
-    page: 1,
   },
 }
 
@@ -27,10 +25,8 @@ const ideaSlice = createSlice({
       state.loading = false
       state.ideas = action.payload.results
       state.pagination = {
-        count: action.payload.count,
         next: action.payload.next,
         previous: action.payload.previous,
-        page: action.payload.page || 1,
       }
     },
     fetchIdeasFailure: (state, action) => {
@@ -43,7 +39,7 @@ const ideaSlice = createSlice({
     },
     fetchMyIdeasSuccess: (state, action) => {
       state.loading = false
-      state.myIdeas = action.payload
+      state.myIdeas = action.payload.results
     },
     fetchMyIdeasFailure: (state, action) => {
       state.loading = false